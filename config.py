@@ -9,5 +9,90 @@ SLACK_CHANNEL = os.getenv('SLACK_CHANNEL', 'seu_canal_slack_aqui')
 GOOGLE_SHEETS_URL = os.getenv('GOOGLE_SHEETS_URL', 'https://docs.google.com/spreadsheets/d/1tE7ZBhvsfUqcZNa4UnrrALrXOwRlc185a7iVPh_iv7g/edit?gid=1046712131')
 
 PROCESSED_DATA_FILE = 'data/processed_records.json'
+# Registros processados (SQLite); o PROCESSED_DATA_FILE do formato anterior é importado uma única vez
+PROCESSED_DB_FILE = os.getenv('PROCESSED_DB_FILE', 'data/processed_records.db')
+# Marcações (mark_as_processed) acumuladas em memória antes de gravar no banco: a cada
+# PROCESSED_FLUSH_EVERY registros ou PROCESSED_FLUSH_SECONDS segundos, e ao fechar o DataManager
+PROCESSED_FLUSH_EVERY = int(os.getenv('PROCESSED_FLUSH_EVERY', '20'))
+PROCESSED_FLUSH_SECONDS = float(os.getenv('PROCESSED_FLUSH_SECONDS', '30'))
+# Retenção dos registros processados por título: idade máxima (dias) e quantidade máxima (0 desativa).
+# Atenção: process_all_sheets relê todas as abas, então um grupo removido pela retenção volta a ser enviado.
+PROCESSED_RETENTION_DAYS = int(os.getenv('PROCESSED_RETENTION_DAYS', '0'))
+PROCESSED_MAX_PER_TITLE = int(os.getenv('PROCESSED_MAX_PER_TITLE', '0'))
+# Arquivo compactado (JSON por linha, gzip) para onde vão os detalhes removidos pela retenção/compactação
+PROCESSED_ARCHIVE_FILE = os.getenv('PROCESSED_ARCHIVE_FILE', 'data/processed_archive.jsonl.gz')
 
-LOG_FILE = 'logs/excel_to_slack.log' 
\ No newline at end of file
+LOG_FILE = 'logs/excel_to_slack.log'
+
+# Nível padrão dos logs e níveis por subsistema (sheets, quota, sites, slack, db, data),
+# ex.: LOG_LEVELS="sheets=DEBUG,slack=WARNING". LOG_FORMAT: 'text' ou 'json' (uma linha por evento).
+# LOG_SAMPLE_EVERY=N registra apenas 1 a cada N mensagens de depuração dos laços por linha.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', '1'))
+
+# Lê apenas as colunas (e, quando possível, as linhas) usadas das abas do mês vigente
+SHEETS_NARROW_READS = os.getenv('SHEETS_NARROW_READS', 'true').lower() in ('1', 'true', 'sim', 'yes')
+
+# Snapshot local das planilhas: leituras são servidas do disco enquanto o modifiedTime
+# do Drive não mudar. SHEETS_SNAPSHOT_MAX_AGE (segundos) força uma releitura periódica,
+# pois fórmulas como IMPORTRANGE podem mudar valores sem alterar o modifiedTime.
+SHEETS_SNAPSHOT_ENABLED = os.getenv('SHEETS_SNAPSHOT_ENABLED', 'true').lower() in ('1', 'true', 'sim', 'yes')
+SHEETS_SNAPSHOT_DIR = os.getenv('SHEETS_SNAPSHOT_DIR', 'data/sheets_snapshots')
+SHEETS_SNAPSHOT_MAX_AGE = int(os.getenv('SHEETS_SNAPSHOT_MAX_AGE', '3600'))
+
+# Cota de leitura do Google Sheets (requisições por minuto por usuário/conta de serviço),
+# dividida entre os processos que rodam ao mesmo tempo com as mesmas credenciais
+SHEETS_READS_PER_MINUTE = int(os.getenv('SHEETS_READS_PER_MINUTE', '55'))
+SHEETS_WORKER_PROCESSES = int(os.getenv('SHEETS_WORKER_PROCESSES', '1'))
+
+# Quantidade de sites processados em paralelo (o ritmo continua limitado pela cota do Sheets)
+SITE_WORKERS = int(os.getenv('SITE_WORKERS', '4'))
+
+# Execução offline / medições: 'live' usa a API real, 'record' usa a API real e grava as
+# respostas em SHEETS_FIXTURES_DIR, 'replay' serve as planilhas a partir desse diretório
+SHEETS_BACKEND = os.getenv('SHEETS_BACKEND', 'live')
+SHEETS_FIXTURES_DIR = os.getenv('SHEETS_FIXTURES_DIR', 'data/fixtures/sheets')
+
+# 'mysql' usa o banco real; 'local' lê os sites de DB_FIXTURE_FILE
+DB_BACKEND = os.getenv('DB_BACKEND', 'mysql')
+DB_FIXTURE_FILE = os.getenv('DB_FIXTURE_FILE', 'data/fixtures/sites.json')
+
+# 'webhook' envia ao Slack; 'local' grava as mensagens em SLACK_LOCAL_FILE (JSON por linha)
+SLACK_BACKEND = os.getenv('SLACK_BACKEND', 'webhook')
+SLACK_LOCAL_FILE = os.getenv('SLACK_LOCAL_FILE', 'data/fixtures/slack_messages.jsonl')
+
+# Envio aos webhooks do Slack: timeouts (segundos) e conexões mantidas abertas por host
+SLACK_CONNECT_TIMEOUT = float(os.getenv('SLACK_CONNECT_TIMEOUT', '5'))
+SLACK_READ_TIMEOUT = float(os.getenv('SLACK_READ_TIMEOUT', '10'))
+SLACK_POOL_SIZE = int(os.getenv('SLACK_POOL_SIZE', '4'))
+
+# Modo resumo: envia as atualizações dos sites e o resumo de cada canal em uma única
+# mensagem (Block Kit), em vez de uma mensagem por site
+SLACK_DIGEST = os.getenv('SLACK_DIGEST', 'false').lower() in ('1', 'true', 'sim', 'yes')
+
+# Entrega assíncrona: as mensagens vão para uma fila com uma thread por webhook, no ritmo
+# de SLACK_MESSAGES_PER_MINUTE, com até SLACK_MAX_RETRIES novas tentativas por mensagem
+SLACK_ASYNC_DELIVERY = os.getenv('SLACK_ASYNC_DELIVERY', 'true').lower() in ('1', 'true', 'sim', 'yes')
+SLACK_MESSAGES_PER_MINUTE = float(os.getenv('SLACK_MESSAGES_PER_MINUTE', '60'))
+SLACK_MAX_RETRIES = int(os.getenv('SLACK_MAX_RETRIES', '5'))
+
+# Canais atendidos ao mesmo tempo por SlackClient.send_batch (token de bot)
+SLACK_BATCH_WORKERS = int(os.getenv('SLACK_BATCH_WORKERS', '4'))
+
+# Outbox: as mensagens são gravadas em SQLite antes do envio e as que falharem são
+# reenviadas nas próximas execuções (até SLACK_OUTBOX_MAX_ATTEMPTS execuções)
+SLACK_OUTBOX_ENABLED = os.getenv('SLACK_OUTBOX_ENABLED', 'true').lower() in ('1', 'true', 'sim', 'yes')
+SLACK_OUTBOX_FILE = os.getenv('SLACK_OUTBOX_FILE', 'data/slack_outbox.db')
+SLACK_OUTBOX_MAX_ATTEMPTS = int(os.getenv('SLACK_OUTBOX_MAX_ATTEMPTS', '10'))
+SLACK_OUTBOX_RETENTION_DAYS = int(os.getenv('SLACK_OUTBOX_RETENTION_DAYS', '7'))
+# Tempo (segundos) em que uma mensagem em envio fica reservada a um processo; depois disso
+# outro processo pode reenviá-la (ex.: se o primeiro foi interrompido)
+SLACK_OUTBOX_LEASE_SECONDS = int(os.getenv('SLACK_OUTBOX_LEASE_SECONDS', '900'))
+
+# Supressão de repetições: um canal não recebe de novo, para a mesma data, exatamente as
+# mesmas mensagens enviadas há menos de SLACK_DEDUP_WINDOW_HOURS horas
+SLACK_DEDUP_ENABLED = os.getenv('SLACK_DEDUP_ENABLED', 'true').lower() in ('1', 'true', 'sim', 'yes')
+SLACK_DEDUP_FILE = os.getenv('SLACK_DEDUP_FILE', 'data/slack_sent.db')
+SLACK_DEDUP_WINDOW_HOURS = float(os.getenv('SLACK_DEDUP_WINDOW_HOURS', '24'))
@@ -1,76 +1,468 @@
+import atexit
+import gzip
 import json
 import os
 import logging
+import sqlite3
 import sys
-from typing import Dict, List, Any
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Iterator, Optional, Set, Tuple
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from config import PROCESSED_DATA_FILE
+from config import (
+    PROCESSED_ARCHIVE_FILE,
+    PROCESSED_DATA_FILE,
+    PROCESSED_DB_FILE,
+    PROCESSED_FLUSH_EVERY,
+    PROCESSED_FLUSH_SECONDS,
+    PROCESSED_MAX_PER_TITLE,
+    PROCESSED_RETENTION_DAYS
+)
+
+logger = logging.getLogger('carga_slack.data')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    titulo TEXT NOT NULL,
+    key_field TEXT NOT NULL,
+    key TEXT NOT NULL,
+    record TEXT NOT NULL,
+    processed_at TEXT,
+    UNIQUE (titulo, key_field, key)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
 
 class DataManager:
     """
     Gerencia o armazenamento e recuperação de dados processados para evitar duplicações.
-    Agora salva agrupado por empresa/título (ex: FB ADS, G ADS) em arrays.
+    Os registros ficam agrupados por empresa/título (ex: FB ADS, G ADS) em um banco SQLite,
+    indexados por (título, campo chave, valor), e o antigo processed_records.json é
+    importado na primeira abertura.
+
+    As chaves já processadas ficam em um índice em memória durante a execução, recarregado
+    apenas quando outro processo grava no banco. As marcações (mark_as_processed) entram
+    no índice na hora e são gravadas em lotes: a cada flush_every registros ou
+    flush_seconds segundos, ao final de um bloco batch(), em flush()/close() e ao
+    encerrar o processo. claim_record, usado antes de enviar ao Slack, grava na hora.
+
+    Vários processos podem usar o mesmo banco ao mesmo tempo: o banco fica em modo WAL,
+    toda gravação é uma transação BEGIN IMMEDIATE (que espera a vez de gravar por até
+    busy_timeout) e claim_record reserva um registro de forma atômica antes do envio.
     """
-    
-    def __init__(self, storage_file: str = PROCESSED_DATA_FILE):
+
+    def __init__(self, storage_file: str = PROCESSED_DB_FILE, legacy_file: str = PROCESSED_DATA_FILE,
+                 flush_every: int = PROCESSED_FLUSH_EVERY, flush_seconds: float = PROCESSED_FLUSH_SECONDS):
+        """
+        Args:
+            storage_file: Arquivo SQLite dos registros processados
+            legacy_file: Arquivo JSON do formato anterior, importado uma única vez
+            flush_every: Marcações acumuladas em memória antes de gravar no banco
+            flush_seconds: Tempo máximo (segundos) que uma marcação fica só em memória
+        """
         self.storage_file = storage_file
-        self._ensure_storage_file()
-        
-    def _ensure_storage_file(self) -> None:
-        """Garante que o arquivo de armazenamento existe."""
-        os.makedirs(os.path.dirname(self.storage_file), exist_ok=True)
-        if not os.path.exists(self.storage_file):
-            with open(self.storage_file, 'w') as f:
-                json.dump({}, f)
-    
+        self.legacy_file = legacy_file
+        self.flush_every = max(1, flush_every)
+        self.flush_seconds = flush_seconds
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._pending: List[Tuple[str, Dict[str, Any], str]] = []
+        self._pending_since = None
+        self._index: Dict[str, Set[Tuple[str, str]]] = {}
+        self._index_version = None
+        os.makedirs(os.path.dirname(self.storage_file) or '.', exist_ok=True)
+        # isolation_level=None: as transações são abertas explicitamente em _transaction()
+        self._conn = sqlite3.connect(self.storage_file, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA busy_timeout = 30000")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(SCHEMA)
+        self._upgrade_schema()
+        self._migrate_legacy_file()
+        atexit.register(self.close)
+
+    @staticmethod
+    def _key(record: Dict[str, Any], key_field: str) -> str:
+        """Valor do campo chave serializado, preservando o tipo (1 e "1" são chaves diferentes)."""
+        return json.dumps(record.get(key_field), ensure_ascii=False, sort_keys=True, default=str)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Transação de gravação: BEGIN IMMEDIATE reserva o banco para gravação logo no início,
+        então outro processo espera (busy_timeout) em vez de gravar por cima.
+        """
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conn
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    @contextmanager
+    def batch(self) -> Iterator['DataManager']:
+        """
+        Grava as marcações feitas dentro do bloco (e as que estavam acumuladas) em uma
+        única transação, confirmada ao final do bloco (e desfeita se o bloco terminar com
+        exceção). Enquanto o bloco está aberto, outros processos esperam para gravar.
+
+        Exemplo:
+            with data_manager.batch():
+                for record in records:
+                    data_manager.mark_as_processed(record)
+        """
+        with self._lock:
+            if self._batch_depth:
+                self._batch_depth += 1
+                try:
+                    yield self
+                finally:
+                    self._batch_depth -= 1
+                return
+            index_before = {titulo: set(keys) for titulo, keys in self._index.items()}
+            self._batch_depth = 1
+            try:
+                with self._transaction():
+                    self._write_pending()
+                    yield self
+            except BaseException:
+                self._index = index_before
+                raise
+            finally:
+                self._batch_depth = 0
+
+    def _write_pending(self) -> int:
+        """Insere as marcações acumuladas na transação aberta e limpa o acúmulo."""
+        pending, self._pending, self._pending_since = self._pending, [], None
+        for titulo, record, key_field in pending:
+            self._insert(titulo, record, key_field)
+        return len(pending)
+
+    def flush(self) -> int:
+        """
+        Grava no banco as marcações acumuladas em memória.
+
+        Returns:
+            Quantidade de registros gravados
+        """
+        with self._lock:
+            if not self._pending or self._conn is None:
+                return 0
+            if self._batch_depth:
+                return self._write_pending()
+            pending = list(self._pending)
+            try:
+                with self._transaction():
+                    written = self._write_pending()
+            except sqlite3.Error as e:
+                self._pending = pending + self._pending
+                self._pending_since = self._pending_since or time.monotonic()
+                logger.error(f"Erro ao salvar dados processados: {e}")
+                return 0
+            logger.debug(f"{written} registros processados gravados em {self.storage_file}")
+            return written
+
+    def _data_version(self) -> int:
+        """Muda sempre que outra conexão confirma uma gravação no banco."""
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _load_index(self) -> None:
+        """(Re)carrega o índice de chaves processadas se o banco mudou desde a última leitura."""
+        version = self._data_version()
+        if version == self._index_version:
+            return
+        index = {}
+        for titulo, key_field, key in self._conn.execute("SELECT titulo, key_field, key FROM processed"):
+            index.setdefault(titulo, set()).add((key_field, key))
+        for titulo, record, key_field in self._pending:
+            index.setdefault(titulo, set()).add((key_field, self._key(record, key_field)))
+        self._index = index
+        self._index_version = version
+
+    def _upgrade_schema(self) -> None:
+        """Adiciona a coluna processed_at aos bancos criados antes da retenção."""
+        with self._transaction():
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(processed)")}
+            if 'processed_at' not in columns:
+                self._conn.execute("ALTER TABLE processed ADD COLUMN processed_at TEXT")
+                self._conn.execute(
+                    "UPDATE processed SET processed_at = COALESCE(json_extract(record, '$.data_processamento'), ?)",
+                    (datetime.now().isoformat(),)
+                )
+
+    def _migrate_legacy_file(self) -> None:
+        """Importa o processed_records.json (formato anterior) na primeira abertura do banco."""
+        with self._lock:
+            migrated = self._conn.execute("SELECT value FROM meta WHERE name = 'legacy_json_migrated'").fetchone()
+            if migrated or not os.path.exists(self.legacy_file):
+                return
+            try:
+                with open(self.legacy_file, 'r') as f:
+                    data = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                logger.error(f"Erro ao ler {self.legacy_file} para migração: {e}")
+                return
+            grouped = self._group_by_title(data)
+            with self._transaction():
+                # Outro processo pode ter feito a importação enquanto o arquivo era lido
+                if self._conn.execute("SELECT 1 FROM meta WHERE name = 'legacy_json_migrated'").fetchone():
+                    return
+                for titulo, registros in grouped.items():
+                    for record in registros:
+                        self._insert(titulo, record, 'id')
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (name, value) VALUES ('legacy_json_migrated', ?)", (self.legacy_file,)
+                )
+            total = sum(len(registros) for registros in grouped.values())
+            logger.info(f"{total} registros processados importados de {self.legacy_file} para {self.storage_file}")
+
+    @staticmethod
+    def _group_by_title(data: Any) -> Dict[str, List[Dict[str, Any]]]:
+        """Normaliza o conteúdo do JSON antigo (lista ou dicionário por título)."""
+        if isinstance(data, list):
+            grouped = {}
+            for rec in data:
+                titulo = rec.get('titulo', 'OUTROS')
+                grouped.setdefault(titulo, []).append(rec)
+            return grouped
+        return data if isinstance(data, dict) else {}
+
+    def _insert(self, titulo: str, record: Dict[str, Any], key_field: str) -> bool:
+        """Insere o registro se a chave ainda não existe no título. Retorna True se inseriu."""
+        processed_at = record.get('data_processamento') or datetime.now().isoformat()
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO processed (titulo, key_field, key, record, processed_at) VALUES (?, ?, ?, ?, ?)",
+            (titulo, key_field, self._key(record, key_field),
+             json.dumps(record, ensure_ascii=False, default=str), str(processed_at))
+        )
+        return cursor.rowcount > 0
+
     def get_processed_data(self) -> Dict[str, List[Dict[str, Any]]]:
         """Recupera os dados já processados, agrupados por empresa/título."""
         try:
-            with open(self.storage_file, 'r') as f:
-                data = json.load(f)
-                if isinstance(data, list):
-                    grouped = {}
-                    for rec in data:
-                        titulo = rec.get('titulo', 'OUTROS')
-                        grouped.setdefault(titulo, []).append(rec)
-                    return grouped
-                return data
-        except (json.JSONDecodeError, FileNotFoundError) as e:
-            logging.error(f"Erro ao ler dados processados: {e}")
+            with self._lock:
+                self.flush()
+                rows = self._conn.execute("SELECT titulo, record FROM processed ORDER BY seq").fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao ler dados processados: {e}")
             return {}
-    
-    def save_processed_data(self, data: Dict[str, List[Dict[str, Any]]]) -> None:
-        """Salva os dados processados agrupados por empresa/título."""
+        grouped = {}
+        for titulo, record in rows:
+            grouped.setdefault(titulo, []).append(json.loads(record))
+        return grouped
+
+    def save_processed_data(self, data: Dict[str, List[Dict[str, Any]]], key_field: str = 'id') -> None:
+        """Substitui todos os dados processados pelos informados, agrupados por empresa/título."""
         try:
-            with open(self.storage_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            with self._lock, self._transaction():
+                self._pending, self._pending_since = [], None
+                self._index_version = None
+                self._conn.execute("DELETE FROM processed")
+                for titulo, registros in data.items():
+                    for record in registros:
+                        self._insert(titulo, record, key_field)
         except Exception as e:
-            logging.error(f"Erro ao salvar dados processados: {e}")
-    
+            logger.error(f"Erro ao salvar dados processados: {e}")
+
     def is_record_processed(self, record: Dict[str, Any], key_field: str) -> bool:
         """
-        Verifica se um registro já foi processado com base em um campo chave.
-        Agora busca dentro do array do título correspondente.
+        Verifica se um registro já foi processado com base em um campo chave,
+        dentro do título correspondente.
         """
-        processed_data = self.get_processed_data()
         titulo = record.get('titulo', 'OUTROS')
-        registros = processed_data.get(titulo, [])
-        for processed_record in registros:
-            if processed_record.get(key_field) == record.get(key_field):
-                return True
-        return False
-    
+        try:
+            with self._lock:
+                self._load_index()
+                return (key_field, self._key(record, key_field)) in self._index.get(titulo, ())
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao consultar dados processados: {e}")
+            return False
+
     def mark_as_processed(self, record: Dict[str, Any], key_field: str = 'id') -> None:
         """
-        Marca um registro como processado, agrupando por título.
+        Marca um registro como processado, agrupando por título. O registro entra no índice
+        na hora e é gravado no banco junto com as próximas marcações (ver flush).
+        """
+        titulo = record.get('titulo', 'OUTROS')
+        with self._lock:
+            # As gravações desta conexão não alteram o data_version, então o índice é atualizado aqui
+            self._index.setdefault(titulo, set()).add((key_field, self._key(record, key_field)))
+            if self._batch_depth:
+                try:
+                    self._insert(titulo, record, key_field)
+                except sqlite3.Error as e:
+                    logger.error(f"Erro ao salvar dados processados: {e}")
+                return
+            self._pending.append((titulo, record, key_field))
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            if (len(self._pending) >= self.flush_every
+                    or time.monotonic() - self._pending_since >= self.flush_seconds):
+                self.flush()
+
+    def claim_record(self, record: Dict[str, Any], key_field: str = 'id') -> bool:
+        """
+        Reserva o registro de forma atômica antes do envio: grava-o apenas se nenhum
+        processo o gravou antes.
+
+        Returns:
+            True se este processo reservou o registro e deve enviá-lo; False se já foi
+            processado ou reservado por outro processo
+
+        Raises:
+            sqlite3.Error: Se não foi possível consultar ou gravar o banco (ex.: banco
+                bloqueado além do busy_timeout); o registro não foi reservado e pode ser
+                tentado de novo
         """
-        processed_data = self.get_processed_data()
         titulo = record.get('titulo', 'OUTROS')
-        if titulo not in processed_data:
-            processed_data[titulo] = []
-        for existing in processed_data[titulo]:
-            if existing.get(key_field) == record.get(key_field):
-                return  
-        processed_data[titulo].append(record)
-        self.save_processed_data(processed_data) 
\ No newline at end of file
+        key = self._key(record, key_field)
+        with self._lock:
+            self._load_index()
+            if (key_field, key) in self._index.get(titulo, ()):
+                return False
+            with self._transaction():
+                claimed = self._insert(titulo, record, key_field)
+            self._index.setdefault(titulo, set()).add((key_field, key))
+            return claimed
+
+    def release_record(self, record: Dict[str, Any], key_field: str = 'id') -> None:
+        """Desfaz a reserva de um registro cujo envio falhou, para que seja tentado de novo."""
+        titulo = record.get('titulo', 'OUTROS')
+        key = self._key(record, key_field)
+        with self._lock:
+            try:
+                with self._transaction():
+                    self._conn.execute(
+                        "DELETE FROM processed WHERE titulo = ? AND key_field = ? AND key = ?", (titulo, key_field, key)
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Erro ao liberar registro processado: {e}")
+                return
+            self._index.get(titulo, set()).discard((key_field, key))
+
+    @staticmethod
+    def _archive(rows: List[Tuple[str, str]], archive_file: str) -> None:
+        """
+        Acrescenta os registros (título, JSON do registro) ao arquivo compactado como um novo
+        membro gzip (arquivos gzip concatenados são lidos como um só), sem reescrever o que
+        já foi arquivado. O membro é comprimido em memória e gravado de uma vez (modo
+        append), de modo que gravações de processos distintos não se intercalam.
+        """
+        lines = "".join(
+            json.dumps({'titulo': titulo, 'record': json.loads(record)}, ensure_ascii=False) + "\n"
+            for titulo, record in rows
+        )
+        os.makedirs(os.path.dirname(archive_file) or '.', exist_ok=True)
+        with open(archive_file, 'ab') as f:
+            f.write(gzip.compress(lines.encode('utf-8')))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _archive_safely(self, rows: List[Tuple[str, str]], archive_file: Optional[str]) -> None:
+        """Arquiva os registros já removidos/compactados no banco; uma falha é apenas registrada."""
+        if not archive_file or not rows:
+            return
+        try:
+            self._archive(rows, archive_file)
+        except OSError as e:
+            logger.error(f"Erro ao arquivar {len(rows)} registros processados em {archive_file}: {e}")
+
+    def apply_retention(self, max_age_days: int = PROCESSED_RETENTION_DAYS,
+                        max_per_title: int = PROCESSED_MAX_PER_TITLE,
+                        archive_file: Optional[str] = PROCESSED_ARCHIVE_FILE) -> int:
+        """
+        Remove, por título, os registros processados há mais de max_age_days dias e os que
+        excedem os max_per_title mais recentes (0 desativa cada critério).
+
+        Args:
+            max_age_days: Idade máxima dos registros, em dias
+            max_per_title: Quantidade máxima de registros mantidos por título
+            archive_file: Arquivo compactado onde os registros removidos são guardados (None descarta)
+
+        Returns:
+            Quantidade de registros removidos
+        """
+        conditions, params = [], []
+        if max_age_days > 0:
+            conditions.append("processed_at < ?")
+            params.append((datetime.now() - timedelta(days=max_age_days)).isoformat())
+        if max_per_title > 0:
+            conditions.append(
+                "seq IN (SELECT seq FROM (SELECT seq, ROW_NUMBER() OVER "
+                "(PARTITION BY titulo ORDER BY processed_at DESC, seq DESC) AS pos FROM processed) WHERE pos > ?)"
+            )
+            params.append(max_per_title)
+        if not conditions:
+            return 0
+        where = " OR ".join(conditions)
+        with self._lock:
+            self.flush()
+            rows = []
+            try:
+                with self._transaction():
+                    if archive_file:
+                        rows = self._conn.execute(
+                            f"SELECT titulo, record FROM processed WHERE {where} ORDER BY seq", params
+                        ).fetchall()
+                    removed = self._conn.execute(f"DELETE FROM processed WHERE {where}", params).rowcount
+            except sqlite3.Error as e:
+                logger.error(f"Erro ao aplicar a retenção dos dados processados: {e}")
+                return 0
+            self._index_version = None
+            # Arquivados só depois da remoção confirmada: uma transação desfeita não deixa
+            # registros que voltariam a ser arquivados na próxima retenção
+            self._archive_safely(rows, archive_file)
+        if removed:
+            logger.info(f"Retenção: {removed} registros processados removidos de {self.storage_file}")
+        return removed
+
+    def compact(self, archive_file: Optional[str] = PROCESSED_ARCHIVE_FILE) -> int:
+        """
+        Reduz cada registro às chaves usadas na verificação de duplicidade (título, campo
+        chave e data de processamento), guardando os detalhes (blocos etc.) no arquivo
+        compactado, e libera o espaço do banco.
+
+        Returns:
+            Quantidade de registros compactados
+        """
+        with self._lock:
+            self.flush()
+            try:
+                # A leitura fica dentro da transação: nenhum outro processo altera os registros
+                # entre a leitura e a regravação
+                with self._transaction():
+                    rows = self._conn.execute(
+                        "SELECT seq, titulo, key_field, key, record, processed_at FROM processed ORDER BY seq"
+                    ).fetchall()
+                    compacted, archived = [], []
+                    for seq, titulo, key_field, key, record, processed_at in rows:
+                        minimal = {key_field: json.loads(key), 'titulo': titulo, 'data_processamento': processed_at}
+                        if json.loads(record) == minimal:
+                            continue
+                        compacted.append((json.dumps(minimal, ensure_ascii=False), seq))
+                        archived.append((titulo, record))
+                    self._conn.executemany("UPDATE processed SET record = ? WHERE seq = ?", compacted)
+                self._conn.execute("VACUUM")
+            except sqlite3.Error as e:
+                logger.error(f"Erro ao compactar os dados processados: {e}")
+                return 0
+            self._archive_safely(archived, archive_file)
+        logger.info(f"Compactação: {len(compacted)} registros processados reduzidos às chaves em {self.storage_file}")
+        return len(compacted)
+
+    def close(self) -> None:
+        """Grava as marcações acumuladas e fecha a conexão com o banco."""
+        with self._lock:
+            if self._conn is None:
+                return
+            self.flush()
+            self._conn.close()
+            self._conn = None
+        atexit.unregister(self.close)
@@ -5,9 +5,17 @@ Conecta-se ao MySQL através do XAMPP (localhost).
 
 import mysql.connector
 from mysql.connector import Error
+import json
 import logging
+import os
+import sys
 from typing import Dict, Any, List, Optional, Tuple
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import DB_BACKEND, DB_FIXTURE_FILE
+
+logger = logging.getLogger('carga_slack.db')
+
 class DBManager:
     """Classe para gerenciar conexões e operações no banco de dados MySQL."""
     
@@ -47,18 +55,18 @@ class DBManager:
             
             if self.connection.is_connected():
                 
-                logging.info(f"Conectado ao MySQL: {self.host}:{self.port}, banco de dados: {self.database}")
+                logger.info(f"Conectado ao MySQL: {self.host}:{self.port}, banco de dados: {self.database}")
                 return True
                 
         except Error as e:
-            logging.error(f"Erro ao conectar ao MySQL: {e}")
+            logger.error(f"Erro ao conectar ao MySQL: {e}")
             return False
             
     def disconnect(self) -> None:
         """Fecha a conexão com o banco de dados."""
         if self.connection and self.connection.is_connected():
             self.connection.close()
-            logging.info("Conexão com o MySQL fechada")
+            logger.info("Conexão com o MySQL fechada")
             
     def _create_tables(self) -> None:
         """Cria as tabelas necessárias se não existirem."""
@@ -140,11 +148,11 @@ class DBManager:
                 """, (site_id, investimento_idx, receita_idx, roas_idx, mc_idx))
             
             self.connection.commit()
-            logging.info(f"Site '{name}' adicionado/atualizado com sucesso")
+            logger.info(f"Site '{name}' adicionado/atualizado com sucesso")
             return True
             
         except Error as e:
-            logging.error(f"Erro ao adicionar/atualizar site: {e}")
+            logger.error(f"Erro ao adicionar/atualizar site: {e}")
             return False
     
     def get_site_config(self, name: str) -> Dict[str, Any]:
@@ -184,7 +192,7 @@ class DBManager:
             return self.get_default_config()
             
         except Error as e:
-            logging.error(f"Erro ao buscar configuração do site: {e}")
+            logger.error(f"Erro ao buscar configuração do site: {e}")
             return self.get_default_config()
     
     def get_default_config(self) -> Dict[str, Any]:
@@ -222,7 +230,7 @@ class DBManager:
             return [row[0] for row in results]
             
         except Error as e:
-            logging.error(f"Erro ao listar sites: {e}")
+            logger.error(f"Erro ao listar sites: {e}")
             return []
     
     def delete_site(self, name: str) -> bool:
@@ -247,5 +255,96 @@ class DBManager:
             return affected_rows > 0
             
         except Error as e:
-            logging.error(f"Erro ao remover site: {e}")
-            return False 
\ No newline at end of file
+            logger.error(f"Erro ao remover site: {e}")
+            return False
+
+
+class LocalDBManager(DBManager):
+    """
+    Substituto local do DBManager que lê os sites de um arquivo JSON, para executar
+    o job sem acesso ao MySQL (testes e medições de desempenho).
+
+    Formato do arquivo:
+
+        {"sites": [{"name": "Site", "sheet_url": "...", "indices": {"investimento": 7, ...},
+                    "slack_webhook_url": "...", "squad_name": "..."}]}
+    """
+
+    def __init__(self, fixture_file: str = DB_FIXTURE_FILE):
+        """
+        Inicializa o gerenciador local.
+
+        Args:
+            fixture_file: Caminho do arquivo JSON com os sites
+        """
+        self.fixture_file = fixture_file
+        self.connection = None
+        self.sites = {}
+
+    def connect(self) -> bool:
+        """Carrega os sites do arquivo de fixture."""
+        try:
+            with open(self.fixture_file, 'r') as f:
+                data = json.load(f)
+            self.sites = {site['name']: site for site in data.get('sites', [])}
+            return True
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Erro ao ler fixture de sites {self.fixture_file}: {e}")
+            return False
+
+    def disconnect(self) -> None:
+        """Nada a fechar no modo local."""
+
+    def _save(self) -> None:
+        """Grava os sites de volta no arquivo de fixture."""
+        with open(self.fixture_file, 'w') as f:
+            json.dump({'sites': list(self.sites.values())}, f, indent=2, ensure_ascii=False)
+
+    def add_site(self, name: str, sheet_url: str, investimento_idx: int,
+                receita_idx: int, roas_idx: int, mc_idx: int) -> bool:
+        """Adiciona ou atualiza um site no arquivo de fixture."""
+        site = self.sites.setdefault(name, {'name': name})
+        site['sheet_url'] = sheet_url
+        site['indices'] = {
+            "investimento": investimento_idx,
+            "receita": receita_idx,
+            "roas": roas_idx,
+            "mc": mc_idx
+        }
+        self._save()
+        return True
+
+    def get_site_config(self, name: str) -> Dict[str, Any]:
+        """Obtém a configuração de um site pelo nome."""
+        site = self.sites.get(name)
+        if not site:
+            return self.get_default_config()
+        return {
+            "sheet_url": site.get("sheet_url"),
+            "indices": site.get("indices", self.get_default_config()["indices"]),
+            "slack_webhook_url": site.get("slack_webhook_url"),
+            "squad_name": site.get("squad_name")
+        }
+
+    def get_all_sites(self) -> List[str]:
+        """Retorna a lista de todos os sites da fixture."""
+        return list(self.sites.keys())
+
+    def delete_site(self, name: str) -> bool:
+        """Remove um site do arquivo de fixture."""
+        if self.sites.pop(name, None) is None:
+            return False
+        self._save()
+        return True
+
+
+def create_db_manager() -> DBManager:
+    """
+    Cria o gerenciador de banco configurado em DB_BACKEND ('mysql' ou 'local').
+
+    Returns:
+        Instância de DBManager ou LocalDBManager
+    """
+    if DB_BACKEND == 'local':
+        return LocalDBManager()
+    return DBManager()
@@ -0,0 +1,77 @@
+"""
+Fábrica de clientes autorizados do Google Sheets compartilhada pelo processo.
+
+Autoriza cada arquivo de credenciais uma única vez, renova o token apenas quando
+ele expira e mantém em cache as planilhas já abertas, indexadas pela URL.
+"""
+
+import gspread
+from google.oauth2.service_account import Credentials
+from google.auth.transport.requests import Request
+import logging
+import threading
+from typing import Dict, Tuple
+
+from rate_limiter import call_with_rate_limit, get_sheets_limiter
+
+logger = logging.getLogger('carga_slack.sheets')
+
+SCOPES = [
+    'https://spreadsheets.google.com/feeds',
+    'https://www.googleapis.com/auth/drive'
+]
+
+_lock = threading.RLock()
+_clients: Dict[str, Tuple[Credentials, gspread.Client]] = {}
+_spreadsheets: Dict[Tuple[str, str], gspread.Spreadsheet] = {}
+_open_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+def get_client(creds_path: str = 'google_service_account.json') -> gspread.Client:
+    """
+    Retorna o cliente gspread autorizado para o arquivo de credenciais informado,
+    criando-o na primeira chamada e renovando o token se ele tiver expirado.
+
+    Args:
+        creds_path: Caminho para o arquivo de credenciais JSON
+
+    Returns:
+        Cliente gspread autorizado
+    """
+    with _lock:
+        if creds_path not in _clients:
+            creds = Credentials.from_service_account_file(creds_path, scopes=SCOPES)
+            _clients[creds_path] = (creds, gspread.authorize(creds))
+            logger.info(f"Cliente do Google autorizado com as credenciais {creds_path}")
+        creds, gc = _clients[creds_path]
+        if not creds.valid:
+            creds.refresh(Request())
+            logger.info("Token do Google renovado")
+        return gc
+
+def open_spreadsheet(spreadsheet_url: str, creds_path: str = 'google_service_account.json') -> gspread.Spreadsheet:
+    """
+    Abre uma planilha pela URL, reaproveitando a instância já aberta no processo.
+    A abertura (requisição à API) é feita fora do lock global, com um lock por planilha:
+    planilhas diferentes abrem em paralelo e a mesma planilha é aberta uma única vez.
+
+    Args:
+        spreadsheet_url: URL da planilha do Google Sheets
+        creds_path: Caminho para o arquivo de credenciais JSON
+
+    Returns:
+        Planilha aberta
+    """
+    key = (creds_path, spreadsheet_url)
+    with _lock:
+        gc = get_client(creds_path)
+        if key in _spreadsheets:
+            return _spreadsheets[key]
+        open_lock = _open_locks.setdefault(key, threading.Lock())
+    with open_lock:
+        with _lock:
+            if key in _spreadsheets:
+                return _spreadsheets[key]
+        spreadsheet = call_with_rate_limit(get_sheets_limiter(), gc.open_by_url, spreadsheet_url)
+        with _lock:
+            _spreadsheets[key] = spreadsheet
+        return spreadsheet
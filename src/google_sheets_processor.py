@@ -1,21 +1,49 @@
-import gspread
-from google.oauth2.service_account import Credentials
 import pandas as pd
 from typing import List, Dict, Any, Optional, Tuple
+import hashlib
+import json
 import logging
+import os
+import sys
+import time
+from datetime import date
 
-from db_manager import DBManager
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import SHEETS_SNAPSHOT_ENABLED, SHEETS_SNAPSHOT_MAX_AGE
+from db_manager import create_db_manager
+from log_config import SAMPLED
+from sheet_dates import RecordList, TabCalendar, parse_sheet_date
+from sheet_records import build_records
+from sheets_backends import WorksheetInfo, create_backend, request_key
+from sheets_snapshot import SheetsSnapshotStore
 
-SCOPES = [
-    'https://spreadsheets.google.com/feeds',
-    'https://www.googleapis.com/auth/drive'
-]
+logger = logging.getLogger('carga_slack.sheets')
+
+# Tempo de vida (em segundos) do índice GID -> aba. None mantém o índice
+# durante toda a vida do processador; ele só é recarregado quando um GID não é encontrado.
+WORKSHEET_INDEX_TTL = None
+
+# Leitura reduzida: quantidade de linhas inspecionadas para achar o cabeçalho
+# e janela de linhas lidas ao redor do dia pedido.
+HEADER_SCAN_ROWS = 20
+NARROW_ROW_WINDOW = 3
+
+# Esquema (linha do cabeçalho, índices de colunas e fingerprint do cabeçalho) por
+# (URL da planilha, GID), compartilhado entre instâncias do processador no mesmo processo.
+# O esquema só é resolvido de novo quando o fingerprint do cabeçalho muda.
+_SCHEMA_CACHE: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+# Intervalo (em segundos) durante o qual o modifiedTime consultado no Drive é reaproveitado
+MODIFIED_TIME_TTL = 5
 
 class GoogleSheetsProcessor:
     """
-    Classe para processar dados do Google Sheets usando a API oficial (gspread).
+    Classe para processar dados do Google Sheets. O acesso à planilha é feito pelo
+    backend configurado em SHEETS_BACKEND (API oficial via gspread ou arquivos locais).
     """
-    def __init__(self, spreadsheet_url: str, site_name: str, creds_path: str = 'google_service_account.json'):
+    def __init__(self, spreadsheet_url: str, site_name: str, creds_path: str = 'google_service_account.json',
+                 worksheet_index_ttl: Optional[float] = WORKSHEET_INDEX_TTL,
+                 site_config: Optional[Dict[str, Any]] = None):
         """
         Inicializa o processador com a URL da planilha e as credenciais de serviço.
         
@@ -23,26 +51,34 @@ class GoogleSheetsProcessor:
             spreadsheet_url: URL da planilha do Google Sheets
             site_name: Nome do site para obter a configuração de índices
             creds_path: Caminho para o arquivo de credenciais JSON
+            worksheet_index_ttl: Tempo de vida do índice de abas em segundos (None = sem expiração)
+            site_config: Configuração do site já carregada (evita abrir uma conexão com o banco)
         """
         self.spreadsheet_url = spreadsheet_url
         self.creds_path = creds_path
         self.site_name = site_name
-        self.db_manager = DBManager()
-        self.db_manager.connect()
-        self.site_config = self.db_manager.get_site_config(site_name)
+        if site_config is None:
+            self.db_manager = create_db_manager()
+            self.db_manager.connect()
+            site_config = self.db_manager.get_site_config(site_name)
+        else:
+            self.db_manager = None
+        self.site_config = site_config
+        self.worksheet_index_ttl = worksheet_index_ttl
+        self._worksheet_index = {}
+        self._worksheet_index_loaded_at = None
+        self._tab_calendar = None
+        self.snapshot_store = SheetsSnapshotStore() if SHEETS_SNAPSHOT_ENABLED else None
+        self._snapshot = None
+        self._modified_time = None
+        self._modified_time_checked_at = None
         
         try:
-            self.creds = Credentials.from_service_account_file(
-                self.creds_path, 
-                scopes=SCOPES
-            )
-            self.gc = gspread.authorize(self.creds)
-            self.spreadsheet = self.gc.open_by_url(self.spreadsheet_url)
-            logging.info(f"Conexão com a planilha estabelecida: {self.spreadsheet.title}")
+            self.backend = create_backend(self.spreadsheet_url, self.creds_path)
+            logger.info(f"Conexão com a planilha estabelecida: {self.backend.title}")
         except Exception as e:
             import traceback
-            logging.error(f"Erro ao conectar à planilha: {e}\n{traceback.format_exc()}")
-            print(f"Erro ao conectar à planilha: {e}\n{traceback.format_exc()}")
+            logger.error(f"Erro ao conectar à planilha: {e}\n{traceback.format_exc()}")
             raise
 
     def get_sheet_ids(self) -> List[Dict[str, str]]:
@@ -53,18 +89,183 @@ class GoogleSheetsProcessor:
             Lista com informações das abas (nome e ID)
         """
         try:
+            index = self._load_worksheet_index()
             sheets = []
-            for ws in self.spreadsheet.worksheets():
+            for ws in index.values():
                 sheets.append({
                     'name': ws.title,
                     'id': str(ws.id)
                 })
-            logging.info(f"Abas encontradas via API: {sheets}")
+            logger.info(f"Abas encontradas via API: {sheets}")
             return sheets
         except Exception as e:
-            logging.error(f"Erro ao obter lista de abas: {e}")
+            logger.error(f"Erro ao obter lista de abas: {e}")
+            return []
+
+    def _load_worksheet_index(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Retorna o índice GID -> aba, consultando a API apenas se o índice
+        ainda não existe, expirou (TTL) ou se force=True.
+        
+        Args:
+            force: Recarrega o índice mesmo que ainda seja válido
+            
+        Returns:
+            Dicionário ordenado GID -> Worksheet
+        """
+        expired = (
+            self.worksheet_index_ttl is not None
+            and self._worksheet_index_loaded_at is not None
+            and time.monotonic() - self._worksheet_index_loaded_at > self.worksheet_index_ttl
+        )
+        if force or expired or self._worksheet_index_loaded_at is None:
+            snapshot = self._current_snapshot()
+            if not force and snapshot is not None and snapshot.get('worksheets'):
+                worksheets = [WorksheetInfo(ws['title'], ws['id']) for ws in snapshot['worksheets']]
+            else:
+                worksheets = self.backend.list_worksheets()
+                if snapshot is not None:
+                    snapshot['worksheets'] = [{'title': ws.title, 'id': ws.id} for ws in worksheets]
+                    self.snapshot_store.save(self.backend.id, snapshot)
+            self._worksheet_index = {str(ws.id): ws for ws in worksheets}
+            self._tab_calendar = TabCalendar({'name': ws.title, 'id': str(ws.id)} for ws in worksheets)
+            self._worksheet_index_loaded_at = time.monotonic()
+        return self._worksheet_index
+
+    def get_sheets_for_month(self, year: int, month: int) -> List[Dict[str, str]]:
+        """
+        Retorna as abas do mês/ano informado (ex.: "Maio 2025"), classificadas pelo
+        nome quando a lista de abas é carregada.
+        
+        Args:
+            year: Ano
+            month: Mês (1-12)
+            
+        Returns:
+            Lista com informações das abas (nome e ID), na ordem da planilha
+        """
+        try:
+            self._load_worksheet_index()
+            return self._tab_calendar.tabs_for(year, month)
+        except Exception as e:
+            logger.error(f"Erro ao obter abas de {month:02d}/{year}: {e}")
+            return []
+
+    def get_sheets_for_date(self, value: date) -> List[Dict[str, str]]:
+        """
+        Retorna as abas que cobrem a data informada.
+        
+        Args:
+            value: Data
+            
+        Returns:
+            Lista com informações das abas (nome e ID), na ordem da planilha
+        """
+        try:
+            self._load_worksheet_index()
+            return self._tab_calendar.tabs_for_date(value)
+        except Exception as e:
+            logger.error(f"Erro ao obter abas de {value:%d/%m/%Y}: {e}")
+            return []
+
+    def get_tab_periods(self) -> List[Tuple[int, int]]:
+        """Retorna os períodos (ano, mês) que têm abas na planilha, em ordem cronológica."""
+        try:
+            self._load_worksheet_index()
+            return self._tab_calendar.periods()
+        except Exception as e:
+            logger.error(f"Erro ao obter os períodos das abas: {e}")
             return []
 
+    def _get_modified_time(self) -> Optional[str]:
+        """
+        Consulta o modifiedTime da planilha no Drive, reaproveitando o valor
+        por MODIFIED_TIME_TTL segundos.
+        
+        Returns:
+            modifiedTime (RFC 3339) ou None se não for possível consultá-lo
+        """
+        now = time.monotonic()
+        if self._modified_time_checked_at is not None and now - self._modified_time_checked_at < MODIFIED_TIME_TTL:
+            return self._modified_time
+        try:
+            self._modified_time = self.backend.modified_time()
+        except Exception as e:
+            logger.warning(f"Não foi possível consultar o modifiedTime da planilha: {e}")
+            self._modified_time = None
+        self._modified_time_checked_at = now
+        return self._modified_time
+
+    def _current_snapshot(self) -> Optional[Dict[str, Any]]:
+        """
+        Retorna o snapshot local válido para a versão atual da planilha. Se a planilha
+        foi editada (modifiedTime diferente) ou o snapshot passou de SHEETS_SNAPSHOT_MAX_AGE,
+        retorna um snapshot vazio para a versão atual.
+        
+        Returns:
+            Dicionário do snapshot ou None se o snapshot estiver desabilitado/indisponível
+        """
+        if self.snapshot_store is None:
+            return None
+        modified_time = self._get_modified_time()
+        if modified_time is None:
+            return None
+        
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.get('modified_time') != modified_time:
+            snapshot = self.snapshot_store.load(self.backend.id)
+        
+        is_stale = (
+            snapshot.get('modified_time') != modified_time
+            or time.time() - snapshot.get('saved_at', 0) > SHEETS_SNAPSHOT_MAX_AGE
+        )
+        if is_stale:
+            snapshot = {'modified_time': modified_time, 'saved_at': time.time(), 'worksheets': [], 'ranges': {}}
+        elif snapshot is not self._snapshot:
+            logger.info(f"Planilha '{self.backend.title}' sem alterações desde {modified_time}; usando snapshot local")
+        self._snapshot = snapshot
+        return snapshot
+
+    def _batch_get(self, ranges: List[str], params: Optional[Dict[str, Any]] = None) -> List[List[List[str]]]:
+        """
+        Lê vários intervalos em uma única requisição. Enquanto a planilha não for
+        editada, os intervalos já lidos são servidos do snapshot local.
+        
+        Args:
+            ranges: Intervalos em notação A1
+            params: Parâmetros adicionais da API (ex.: majorDimension)
+            
+        Returns:
+            Lista com os valores de cada intervalo, na ordem pedida
+        """
+        snapshot = self._current_snapshot()
+        key = request_key(ranges, params)
+        if snapshot is not None and key in snapshot['ranges']:
+            return snapshot['ranges'][key]
+        
+        values = self.backend.batch_get(ranges, params)
+        
+        if snapshot is not None:
+            snapshot['ranges'][key] = values
+            self.snapshot_store.save(self.backend.id, snapshot)
+        return values
+
+    def _get_worksheet(self, sheet_id: Optional[str]):
+        """
+        Busca a aba pelo GID no índice em memória. Se o GID não estiver no índice,
+        recarrega os metadados da planilha uma única vez antes de desistir.
+        
+        Args:
+            sheet_id: ID da aba da planilha
+            
+        Returns:
+            Worksheet correspondente ou None se não encontrada
+        """
+        ws = self._load_worksheet_index().get(str(sheet_id))
+        if ws is None:
+            ws = self._load_worksheet_index(force=True).get(str(sheet_id))
+        return ws
+
     def read_data(self, sheet_id: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any], str]:
         """
         Lê os dados da aba pelo GID usando gspread e retorna lista de dicionários.
@@ -76,102 +277,364 @@ class GoogleSheetsProcessor:
             Tupla com lista de registros, dados de resumo e nome da aba
         """
         try:
-            ws = None
-            for worksheet in self.spreadsheet.worksheets():
-                if str(worksheet.id) == str(sheet_id):
-                    ws = worksheet
-                    break
-                    
+            ws = self._get_worksheet(sheet_id)
             if ws is None:
-                logging.warning(f"Aba com GID {sheet_id} não encontrada.")
+                logger.warning(f"Aba com GID {sheet_id} não encontrada.")
                 return [], {}, ""
             
-            data = ws.get_all_values()
-            if not data:
-                logging.warning(f"Nenhum dado encontrado na aba {ws.title}")
-                return [], {}, ws.title
-                
-            header_row_index = None
-            for i, row in enumerate(data):
-                if row and (row[0] == "Data" or "Data" in row):
-                    header_row_index = i
-                    break
-            
-
-            if header_row_index is None:
-                header_row_index = 0
-            
-            # Extrai o cabeçalho e os dados
-            headers = data[header_row_index]
-            print("Cabeçalho lido:", headers)
-            # Busca os índices das colunas pelo nome apenas para ROAS e MC
-            indices = self.site_config['indices']
-            investimento_idx = indices['investimento']
-            receita_idx = indices['receita']
-            try:
-                roas_idx = headers.index("ROAS")
-            except ValueError:
-                roas_idx = indices['roas']
-            try:
-                mc_idx = headers.index("MC")
-            except ValueError:
-                mc_idx = indices['mc']
-            
-            rows = data[header_row_index + 1:]
-            
-            rows = [row for row in rows if any(cell.strip() for cell in row)]
-            
-            records = []
-            for row in rows:
-                if len(row) > max(investimento_idx, receita_idx, roas_idx, mc_idx):  
-                    print(f"Linha lida: Data={row[0]}, Investimento={row[investimento_idx] if len(row) > investimento_idx else 'N/A'}, Receita={row[receita_idx] if len(row) > receita_idx else 'N/A'}, ROAS={row[roas_idx] if len(row) > roas_idx else 'N/A'}, MC={row[mc_idx] if len(row) > mc_idx else 'N/A'}")
-                    
-                    new_record = {
-                        'Data': row[0],
-                        'Investimento': row[investimento_idx] if len(row) > investimento_idx else '',
-                        'Receita': row[receita_idx] if len(row) > receita_idx else '',
-                        'ROAS Geral': row[roas_idx] if len(row) > roas_idx else '',
-                        'MC Geral': row[mc_idx] if len(row) > mc_idx else '',
-                    }
-                    records.append(new_record)
-            
-            cleaned_records = self._map_column_names(records)
-            
-            summary = self._extract_summary_data(records)
-            
-            logging.info(f"Dados lidos com sucesso da aba '{ws.title}': {len(cleaned_records)} registros")
-            return cleaned_records, summary, ws.title
+            data = self._pad_rows(self._batch_get([self._quote_title(ws.title)])[0])
+            return self._parse_values(data, ws.title, ws.id)
             
         except Exception as e:
-            logging.error(f"Erro ao ler dados da aba: {e}")
+            logger.error(f"Erro ao ler dados da aba: {e}")
             return [], {}, ""
-    
-    def _map_column_names(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+
+    def read_data_batch(self, sheet_ids: List[str]) -> Dict[str, Tuple[List[Dict[str, Any]], Dict[str, Any], str]]:
         """
-        Mapeia os nomes das colunas para nomes mais amigáveis.
+        Lê várias abas da planilha com uma única requisição (values_batch_get).
         
         Args:
-            records: Lista de registros com nomes de colunas originais
+            sheet_ids: Lista de IDs (GID) das abas a serem lidas
             
         Returns:
-            Lista de registros com nomes de colunas mapeados
+            Dicionário GID -> tupla (registros, resumo, nome da aba), no mesmo
+            formato retornado por read_data
         """
-        if not records:
+        results = {}
+        
+        requested = []
+        for sheet_id in sheet_ids:
+            ws = self._get_worksheet(sheet_id)
+            if ws is None:
+                logger.warning(f"Aba com GID {sheet_id} não encontrada.")
+                results[str(sheet_id)] = ([], {}, "")
+                continue
+            requested.append(ws)
+        
+        if not requested:
+            return results
+        
+        ranges = [self._quote_title(ws.title) for ws in requested]
+        try:
+            batch_values = self._batch_get(ranges)
+        except Exception as e:
+            logger.error(f"Erro ao ler dados em lote: {e}")
+            raise
+        
+        for ws, values in zip(requested, batch_values):
+            results[str(ws.id)] = self._parse_values(self._pad_rows(values), ws.title, ws.id)
+        
+        logger.info(f"Leitura em lote concluída: {len(requested)} abas em uma requisição")
+        return results
+
+    @staticmethod
+    def _quote_title(title: str) -> str:
+        """Monta a notação A1 para uma aba inteira, escapando aspas simples do nome."""
+        return "'" + title.replace("'", "''") + "'"
+
+    @staticmethod
+    def _pad_rows(values: List[List[str]]) -> List[List[str]]:
+        """
+        Completa as linhas com strings vazias até a largura da maior linha,
+        como faz get_all_values (a API omite células vazias no fim da linha).
+        """
+        if not values:
             return []
+        width = max(len(row) for row in values)
+        return [row + [''] * (width - len(row)) for row in values]
+
+    def _parse_values(self, data: List[List[str]], title: str, sheet_id: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any], str]:
+        """
+        Converte os valores brutos de uma aba em registros.
+        
+        Args:
+            data: Matriz de valores da aba (linhas x colunas)
+            title: Nome da aba
+            sheet_id: ID da aba; quando informado, o layout encontrado é guardado
+                para as leituras reduzidas (read_data_narrow)
+            
+        Returns:
+            Tupla com lista de registros, dados de resumo e nome da aba
+        """
+        if not data:
+            logger.warning(f"Nenhum dado encontrado na aba {title}")
+            return [], {}, title
+        
+        layout = self._resolve_layout(data, sheet_id)
+        rows = data[layout['header_row_index'] + 1:]
+        return self._build_records(rows, layout, title)
+
+    def _header_fingerprint(self, headers: List[str]) -> str:
+        """
+        Calcula o fingerprint de um cabeçalho (junto com os índices configurados para o
+        site, que também determinam as colunas resolvidas).
+        """
+        headers = list(headers)
+        while headers and headers[-1] == '':
+            headers.pop()
+        payload = json.dumps([headers, self.site_config['indices']], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _resolve_layout(self, data: List[List[str]], sheet_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Localiza a linha de cabeçalho e resolve os índices das colunas usadas.
+        
+        Quando sheet_id é informado, reaproveita o esquema em cache se o cabeçalho na
+        mesma linha ainda tem o mesmo fingerprint; caso contrário, resolve o esquema
+        de novo e atualiza o cache. Só vai para o cache o esquema cujo cabeçalho foi
+        de fato encontrado; sem cabeçalho, a linha 0 é usada apenas nesta leitura.
+        
+        Args:
+            data: Linhas da aba a partir da primeira linha da planilha
+            sheet_id: ID da aba (opcional)
+            
+        Returns:
+            Dicionário com header_row_index, header_found, os índices de cada coluna e o
+            fingerprint do cabeçalho
+        """
+        cache_key = (self.spreadsheet_url, str(sheet_id))
+        cached = _SCHEMA_CACHE.get(cache_key) if sheet_id is not None else None
+        if cached is not None:
+            row = cached['header_row_index']
+            if row < len(data) and self._header_fingerprint(data[row]) == cached['fingerprint']:
+                return cached
+        
+        header_row_index = None
+        for i, row in enumerate(data):
+            if row and (row[0] == "Data" or "Data" in row):
+                header_row_index = i
+                break
+        
+        header_found = header_row_index is not None
+        if not header_found:
+            header_row_index = 0
+        
+        # Extrai o cabeçalho e os dados
+        headers = data[header_row_index] if data else []
+        logger.debug("Cabeçalho lido: %s", headers)
+        # Busca os índices das colunas pelo nome apenas para ROAS e MC
+        indices = self.site_config['indices']
+        try:
+            roas_idx = headers.index("ROAS")
+        except ValueError:
+            roas_idx = indices['roas']
+        try:
+            mc_idx = headers.index("MC")
+        except ValueError:
+            mc_idx = indices['mc']
+        
+        layout = {
+            'header_row_index': header_row_index,
+            'header_found': header_found,
+            'columns': {
+                'data': 0,
+                'investimento': indices['investimento'],
+                'receita': indices['receita'],
+                'roas': roas_idx,
+                'mc': mc_idx,
+            },
+            'fingerprint': self._header_fingerprint(headers),
+        }
+        if sheet_id is not None and header_found:
+            _SCHEMA_CACHE[cache_key] = layout
+        return layout
+
+    def _build_records(self, rows: List[List[str]], layout: Dict[str, Any], title: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any], str]:
+        """
+        Monta os registros a partir das linhas de dados (abaixo do cabeçalho).
+        
+        Args:
+            rows: Linhas de dados da aba
+            layout: Layout retornado por _resolve_layout
+            title: Nome da aba
+            
+        Returns:
+            Tupla com lista de registros, dados de resumo e nome da aba
+        """
+        columns = layout['columns']
+        investimento_idx = columns['investimento']
+        receita_idx = columns['receita']
+        roas_idx = columns['roas']
+        mc_idx = columns['mc']
+        
+        rows = [row for row in rows if any(cell.strip() for cell in row)]
+        
+        max_idx = max(investimento_idx, receita_idx, roas_idx, mc_idx)
+        rows = [row for row in rows if len(row) > max_idx]
+        if logger.isEnabledFor(logging.DEBUG):
+            for row in rows:
+                logger.debug("Linha lida: Data=%s, Investimento=%s, Receita=%s, ROAS=%s, MC=%s",
+                             row[0], row[investimento_idx], row[receita_idx], row[roas_idx], row[mc_idx],
+                             extra=SAMPLED)
+        
+        records = RecordList(build_records(
+            [row[0] for row in rows],
+            [row[investimento_idx] for row in rows],
+            [row[receita_idx] for row in rows],
+            [row[roas_idx] for row in rows],
+            [row[mc_idx] for row in rows],
+        ))
+        
+        summary = self._extract_summary_data(records)
+        
+        logger.info(f"Dados lidos com sucesso da aba '{title}': {len(records)} registros")
+        return records, summary, title
+
+    def read_data_narrow(self, sheet_ids: List[str], day: Optional[int] = None,
+                         window: int = NARROW_ROW_WINDOW) -> Dict[str, Tuple[List[Dict[str, Any]], Dict[str, Any], str]]:
+        """
+        Lê várias abas em uma única requisição, baixando apenas as colunas usadas
+        (Data, investimento, receita, ROAS e MC) em vez da aba inteira.
+        
+        Sem esquema em cache, procura o cabeçalho nas primeiras HEADER_SCAN_ROWS
+        linhas; se ele não estiver lá, a aba é relida por completo.
+        
+        Quando o esquema da aba já está em cache (linha do cabeçalho e colunas), pede
+        as colunas a partir da linha de dados e, na mesma requisição, a linha do
+        cabeçalho, usada para revalidar o fingerprint do esquema. Se um dia é
+        informado, baixa também apenas as linhas próximas a esse dia, assumindo uma
+        linha por dia logo abaixo do cabeçalho. Se o cabeçalho mudou, se o dia não for
+        encontrado na janela, ou se as colunas resolvidas diferirem das pedidas, a aba
+        é relida por completo com read_data_batch.
+        
+        Args:
+            sheet_ids: Lista de IDs (GID) das abas a serem lidas
+            day: Dia do mês de interesse (opcional)
+            window: Quantidade de linhas lidas antes e depois da linha do dia
+            
+        Returns:
+            Dicionário GID -> tupla (registros, resumo, nome da aba), no mesmo
+            formato retornado por read_data
+        """
+        results = {}
+        plans = []
+        ranges = []
         
-        data_rows = []
+        for sheet_id in sheet_ids:
+            ws = self._get_worksheet(sheet_id)
+            if ws is None:
+                logger.warning(f"Aba com GID {sheet_id} não encontrada.")
+                results[str(sheet_id)] = ([], {}, "")
+                continue
+            
+            layout = _SCHEMA_CACHE.get((self.spreadsheet_url, str(ws.id)))
+            title = self._quote_title(ws.title)
+            plan = {'ws': ws, 'layout': layout, 'probe': None, 'header': None}
+            
+            if layout is None:
+                # Layout desconhecido: pede as primeiras linhas inteiras para achar o
+                # cabeçalho, e as colunas padrão do site desde a primeira linha.
+                indices = self.site_config['indices']
+                columns = sorted({0, indices['investimento'], indices['receita'], indices['roas'], indices['mc']})
+                first_row, last_row = 1, None
+                plan['probe'] = len(ranges)
+                ranges.append(f"{title}!1:{HEADER_SCAN_ROWS}")
+            else:
+                columns = sorted(set(layout['columns'].values()))
+                header_row = layout['header_row_index'] + 1
+                plan['header'] = len(ranges)
+                ranges.append(f"{title}!{header_row}:{header_row}")
+                first_row = header_row + 1
+                last_row = None
+                if day is not None:
+                    day_row = first_row + day - 1
+                    first_row = max(first_row, day_row - window)
+                    last_row = day_row + window
+            
+            plan['columns'] = columns
+            plan['first_row'] = first_row
+            plan['offset'] = len(ranges)
+            for col in columns:
+                letter = self._column_letter(col)
+                end = f"{letter}{last_row}" if last_row else letter
+                ranges.append(f"{title}!{letter}{first_row}:{end}")
+            plans.append(plan)
+        
+        if not plans:
+            return results
+        
+        try:
+            value_ranges = self._batch_get(ranges, params={'majorDimension': 'COLUMNS'})
+        except Exception as e:
+            logger.error(f"Erro ao ler colunas em lote: {e}")
+            raise
+        
+        def column_values(position):
+            values = value_ranges[position]
+            return values[0] if values else []
+        
+        fallback = []
+        for plan in plans:
+            ws = plan['ws']
+            layout = plan['layout']
+            columns = plan['columns']
+            
+            if plan['probe'] is not None:
+                probe_columns = value_ranges[plan['probe']]
+                probe_rows = self._pad_rows(self._transpose(probe_columns))
+                layout = self._resolve_layout(probe_rows, ws.id)
+                # Cabeçalho fora das primeiras HEADER_SCAN_ROWS linhas: a leitura completa
+                # o localiza (e guarda a linha real no cache)
+                if not layout['header_found'] or not set(layout['columns'].values()) <= set(columns):
+                    fallback.append(ws)
+                    continue
+                skip = layout['header_row_index'] + 1
+            else:
+                header = self._transpose(value_ranges[plan['header']])
+                if self._header_fingerprint(header[0] if header else []) != layout['fingerprint']:
+                    logger.info(f"Cabeçalho da aba '{ws.title}' mudou; resolvendo o esquema novamente")
+                    _SCHEMA_CACHE.pop((self.spreadsheet_url, str(ws.id)), None)
+                    fallback.append(ws)
+                    continue
+                skip = 0
+            
+            width = max(columns) + 1
+            fetched = {col: column_values(plan['offset'] + i)[skip:] for i, col in enumerate(columns)}
+            height = max((len(values) for values in fetched.values()), default=0)
+            rows = []
+            for r in range(height):
+                row = [''] * width
+                for col, values in fetched.items():
+                    if r < len(values):
+                        row[col] = values[r]
+                rows.append(row)
+            
+            parsed = self._build_records(rows, layout, ws.title)
+            if day is not None and plan['probe'] is None and not self._contains_day(parsed[0], day):
+                fallback.append(ws)
+                continue
+            results[str(ws.id)] = parsed
+        
+        if fallback:
+            logger.info(f"Leitura reduzida insuficiente para {[ws.title for ws in fallback]}; relendo abas completas")
+            results.update(self.read_data_batch([ws.id for ws in fallback]))
+        
+        return results
+
+    @staticmethod
+    def _column_letter(index: int) -> str:
+        """Converte um índice de coluna (base 0) na letra da notação A1."""
+        letters = ''
+        index += 1
+        while index:
+            index, remainder = divmod(index - 1, 26)
+            letters = chr(65 + remainder) + letters
+        return letters
+
+    @staticmethod
+    def _transpose(columns: List[List[str]]) -> List[List[str]]:
+        """Converte valores retornados por coluna (majorDimension=COLUMNS) em linhas."""
+        height = max((len(col) for col in columns), default=0)
+        return [[col[r] if r < len(col) else '' for col in columns] for r in range(height)]
+
+    @staticmethod
+    def _contains_day(records: List[Dict[str, Any]], day: int) -> bool:
+        """Verifica se algum registro tem na coluna Data o dia informado."""
         for record in records:
-            if 'Data' in record:
-                new_record = {
-                    'Data': record.get('Data'),
-                    'Investimento': record.get('Investimento'),
-                    'Receita': record.get('Receita'),
-                    'ROAS Geral': record.get('ROAS Geral'),
-                    'MC Geral': record.get('MC Geral'),
-                }
-                data_rows.append(new_record)
-        
-        return data_rows
+            parsed = parse_sheet_date(record.get('Data'))
+            if parsed and parsed[0] == day:
+                return True
+        return False
     
     def _extract_summary_data(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -206,7 +669,7 @@ class GoogleSheetsProcessor:
         return summary 
 
     def extract_titles_and_fields(self, record: Dict[str, Any]) -> List[Dict[str, Any]]:
-        print("Registro recebido para extração:", record)
+        logger.debug("Registro recebido para extração: %s", record, extra=SAMPLED)
         results = []
         data = record.get('Data')
         
@@ -234,7 +697,7 @@ class GoogleSheetsProcessor:
                 'data': data
             })
             
-        print("Blocos extraídos:", results)
+        logger.debug("Blocos extraídos: %s", results, extra=SAMPLED)
         return results
         
     def clean_value(self, val):
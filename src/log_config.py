@@ -0,0 +1,104 @@
+"""
+Configuração dos logs do projeto.
+
+Cada subsistema usa o logger "carga_slack.<subsistema>" (sheets, quota, sites, slack,
+db, data), com nível próprio configurável em LOG_LEVELS. Mensagens de depuração dos
+laços por linha são marcadas com extra=SAMPLED e podem ser amostradas com
+LOG_SAMPLE_EVERY.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+from typing import Dict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import LOG_FILE, LOG_FORMAT, LOG_LEVEL, LOG_LEVELS, LOG_SAMPLE_EVERY
+
+ROOT_LOGGER = 'carga_slack'
+
+# Marca uma mensagem como sujeita à amostragem: logger.debug("...", x, extra=SAMPLED)
+SAMPLED = {'sampled': True}
+
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class SamplingFilter(logging.Filter):
+    """Deixa passar apenas 1 a cada `every` mensagens marcadas com SAMPLED, por logger e mensagem."""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or not getattr(record, 'sampled', False):
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.every == 0
+
+class JsonFormatter(logging.Formatter):
+    """Formata cada evento como um objeto JSON em uma linha, incluindo os campos de `extra`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            'time': self.formatTime(record),
+            'logger': record.name,
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRIBUTES and key != 'sampled':
+                event[key] = value
+        if record.exc_info:
+            event['exception'] = self.formatException(record.exc_info)
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """Converte "sheets=DEBUG,slack=WARNING" em {'sheets': 'DEBUG', 'slack': 'WARNING'}."""
+    levels = {}
+    for item in spec.split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def setup_logging(level: str = LOG_LEVEL, levels: str = LOG_LEVELS, log_format: str = LOG_FORMAT,
+                  sample_every: int = LOG_SAMPLE_EVERY, log_file: str = LOG_FILE) -> None:
+    """
+    Configura os handlers (arquivo e console), o formato e os níveis dos subsistemas.
+
+    Args:
+        level: Nível padrão
+        levels: Níveis por subsistema, ex.: "sheets=DEBUG,slack=WARNING"
+        log_format: 'text' ou 'json'
+        sample_every: Registra 1 a cada N mensagens marcadas com SAMPLED
+        log_file: Arquivo de log
+    """
+    if logging.getLogger().handlers:
+        # Já configurado (ex.: o --agendador chama main() a cada execução)
+        return
+    log_dir = os.path.dirname(log_file)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+
+    if log_format == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    handlers = [logging.FileHandler(log_file), logging.StreamHandler(sys.stdout)]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        # Um filtro por handler: filtros de logger não se aplicam aos loggers filhos, e um filtro
+        # compartilhado contaria cada evento uma vez por handler
+        handler.addFilter(SamplingFilter(sample_every))
+    logging.basicConfig(level=level, handlers=handlers)
+
+    for name, subsystem_level in parse_levels(levels).items():
+        logging.getLogger(f"{ROOT_LOGGER}.{name}").setLevel(subsystem_level)
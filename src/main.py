@@ -2,39 +2,41 @@ import logging
 import sys
 import os
 from typing import Dict, Any, List
-from datetime import datetime, timedelta
-import requests
+from datetime import datetime
 import time
 import pytz
 import random
 import argparse
-import traceback
 import schedule
 import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from google_sheets_processor import GoogleSheetsProcessor
-from db_manager import DBManager
+from db_manager import create_db_manager
 from data_manager import DataManager
+from value_parser import sum_records
+from sheet_dates import parse_sheet_date
+from log_config import setup_logging
+from slack_dedup import content_hash, open_deduplicator
+from slack_delivery import get_webhook_delivery
+from slack_digest import build_digest_payloads
+from slack_outbox import open_outbox
+from slack_queue import SlackDeliveryQueue, TrackingSender
 from config import (
     GOOGLE_SHEETS_URL,
-    LOG_FILE
+    SHEETS_NARROW_READS,
+    SITE_WORKERS,
+    SLACK_ASYNC_DELIVERY,
+    SLACK_DEDUP_ENABLED,
+    SLACK_DIGEST,
+    SLACK_OUTBOX_ENABLED
 )
 
-def setup_logging():
-    log_dir = os.path.dirname(LOG_FILE)
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-        
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(LOG_FILE),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+logger = logging.getLogger('carga_slack.sites')
+slack_logger = logging.getLogger('carga_slack.slack')
 
 def clean_value(val):
     if val in [None, '', '#DIV/0!', '#N/A', '#VALUE!', '#REF!', '#NAME?']:
@@ -143,22 +145,49 @@ e    MC < -100: :rotating_light:
         else:
             return ":money_with_wings:"
     except Exception as e:
-        print(f"Erro ao processar MC: {e}, valor: {mc_value}")
+        logger.debug("Erro ao processar MC: %s, valor: %s", e, mc_value)
         return ""
 
-def send_to_slack(message: str, webhook_url: str) -> bool:
-    logging.info(f"Enviando mensagem ao Slack: {message}")
-    try:
-        response = requests.post(
-            webhook_url,
-            json={"text": message},
-            headers={"Content-type": "application/json"}
-        )
-        logging.info(f"Resposta do Slack: status={response.status_code}, body={response.text}")
-        return response.status_code == 200
-    except Exception as e:
-        logging.error(f"Exceção ao enviar mensagem ao Slack: {e}")
-        return False
+def send_to_slack(message: str, webhook_url: str, sender=None) -> bool:
+    slack_logger.info(f"Enviando mensagem ao Slack: {message}")
+    return post_to_slack({"text": message}, webhook_url, sender)
+
+def post_to_slack(payload: Dict[str, Any], webhook_url: str, sender=None) -> bool:
+    """
+    Envia um payload ao webhook, ou o repassa ao sender informado (SlackDeliveryQueue
+    ou SlackOutbox), que cuida da entrega.
+    
+    Returns:
+        True se a mensagem foi enviada (ou entregue ao sender) com sucesso, False caso contrário
+    """
+    if sender is not None:
+        sender.submit(webhook_url, payload)
+        return True
+    return get_webhook_delivery().post(webhook_url, payload).ok
+
+def send_digest_to_slack(messages: List[str], summary: str, webhook_url: str,
+                         fallback_text: str = 'Atualização dos sites', sender=None) -> bool:
+    """
+    Envia as mensagens de um canal e o resumo em uma única mensagem com Block Kit
+    (dividida apenas se exceder os limites do Slack).
+    
+    Args:
+        messages: Mensagens dos sites, na ordem de envio
+        summary: Resumo do canal (opcional)
+        webhook_url: Webhook de destino
+        fallback_text: Texto exibido nas notificações
+        sender: SlackDeliveryQueue ou SlackOutbox (opcional); sem ele o envio é síncrono
+        
+    Returns:
+        True se todas as partes foram enviadas com sucesso, False caso contrário
+    """
+    payloads = build_digest_payloads(messages, summary, fallback_text)
+    slack_logger.info(f"Enviando resumo ao Slack: {len(messages)} mensagens em {len(payloads)} envio(s)")
+    sucesso = True
+    for payload in payloads:
+        if not post_to_slack(payload, webhook_url, sender):
+            sucesso = False
+    return sucesso
 
 def get_current_date_str() -> str:
     """Retorna a data atual no formato DD/MM usando o fuso horário de Brasília.""" 
@@ -187,54 +216,34 @@ def to_float(val):
 def process_current_date_only(sheets_url: str, site_name: str) -> None:
     sheets_processor = GoogleSheetsProcessor(sheets_url, site_name=site_name)
     current_date = get_current_date_str()
-    current_month = datetime.now().month
-    current_year = datetime.now().year
-    db = DBManager()
+    current_day, current_month_num, _ = parse_sheet_date(current_date)
+    db = create_db_manager()
     db.connect()
     config = db.get_site_config(site_name)
-    print(f"DEBUG: config retornado para {site_name}: {config}")
-    print(f"DEBUG: webhook_url para {site_name}: {config.get('slack_webhook_url')}")
+    logger.debug("Configuração de %s: %s", site_name, config)
     webhook_url = config.get('slack_webhook_url')
     if not webhook_url:
-        logging.warning(f"Site '{site_name}' não possui webhook do Slack configurado!")
+        logger.warning(f"Site '{site_name}' não possui webhook do Slack configurado!")
         return
     sheets = sheets_processor.get_sheet_ids()
     if not sheets:
         return
 
-    for sheet in sheets:
+    for sheet in sheets_processor.get_sheets_for_date(datetime.now().date()):
         sheet_id = sheet['id']
         records, summary, actual_name = sheets_processor.read_data(sheet_id)
         if not records:
             continue
-        pagina = actual_name or sheet['name']
-        
-        aba_mes_vigente = False
-        for mes in ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]:
-            if mes in pagina:
-                mes_num = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"].index(mes) + 1
-                if mes_num == current_month and str(current_year) in pagina:
-                    aba_mes_vigente = True
-                break
-
-        if not aba_mes_vigente:
-            continue
 
-        current_record = None
-        for r in reversed(records):
-            if r.get('Data') == current_date:
-                current_record = r
-                break
+        current_record = records.find_by_date(current_day, current_month_num)
 
         if not current_record:
-            logging.warning(f"Nenhum registro encontrado para a data {current_date}")
+            logger.warning(f"Nenhum registro encontrado para a data {current_date}")
             continue
         
-        print("Data do registro encontrado:", current_record.get('Data'))
-        print("MC bruto da planilha:", current_record.get('MC Geral'))
         mc_geral = clean_value(current_record.get('MC Geral', '0,00'))
-        print("MC após clean_value:", mc_geral)
-        print("MC após to_float:", to_float(mc_geral))
+        logger.debug("Registro de %s encontrado: Data=%s, MC bruto=%s, MC após clean_value=%s",
+                     site_name, current_record.get('Data'), current_record.get('MC Geral'), mc_geral)
         
         investimento = clean_value(current_record.get('Investimento', '0,00'))
         receita = clean_value(current_record.get('Receita', '0,00'))
@@ -271,7 +280,7 @@ def process_current_date_only(sheets_url: str, site_name: str) -> None:
             send_to_slack('```========================= RESUMO =========================```', webhook_url)
             send_to_slack(resumo_final, webhook_url)
         except Exception as e:
-            logging.error(f"Erro ao calcular/enviar resumo do grupo: {e}")
+            logger.error(f"Erro ao calcular/enviar resumo do grupo: {e}")
             send_to_slack(f"Erro ao enviar resumo: {e}", webhook_url)
         
         break 
@@ -285,16 +294,16 @@ def run_monitor(sheets_url: str, site_name: str, interval_seconds: int = 10):
         site_name: Nome do site cadastrado no banco
         interval_seconds: Intervalo entre verificações em segundos
     """
-    logging.info(f"Iniciando monitoramento da data atual com intervalo de {interval_seconds} segundos")
+    logger.info(f"Iniciando monitoramento da data atual com intervalo de {interval_seconds} segundos")
     try:
         while True:
             process_current_date_only(sheets_url, site_name)
             time.sleep(interval_seconds)
     except KeyboardInterrupt:
-        logging.info("Monitoramento interrompido pelo usuário")
+        logger.info("Monitoramento interrompido pelo usuário")
         send_to_slack("Monitoramento interrompido")
     except Exception as e:
-        logging.error(f"Erro durante o monitoramento: {e}")
+        logger.error(f"Erro durante o monitoramento: {e}")
         send_to_slack(f"Erro no monitoramento: {str(e)}")
 
 def process_all_sheets(sheets_url: str, site_name: str) -> Dict[str, int]:
@@ -302,10 +311,11 @@ def process_all_sheets(sheets_url: str, site_name: str) -> Dict[str, int]:
     Processa todas as abas da planilha do Google Sheets e salva registros detalhados por título/bloco.
     Processa um mês inteiro por vez, ao invés de alternar entre abas.
     """
-    db = DBManager()
+    db = create_db_manager()
     db.connect()
     sheets_processor = GoogleSheetsProcessor(sheets_url, site_name=site_name)
     data_manager = DataManager()
+    data_manager.apply_retention()
     stats = {
         'total_sheets': 0,
         'processadas': 0,
@@ -315,16 +325,21 @@ def process_all_sheets(sheets_url: str, site_name: str) -> Dict[str, int]:
     sheets = sheets_processor.get_sheet_ids()
     stats['total_sheets'] = len(sheets)
     if not sheets:
-        logging.warning("Nenhuma aba encontrada na planilha")
+        logger.warning("Nenhuma aba encontrada na planilha")
         return stats
+    periodos = sheets_processor.get_tab_periods()
+    if periodos:
+        (ano_inicio, mes_inicio), (ano_fim, mes_fim) = periodos[0], periodos[-1]
+        logger.info(f"{len(sheets)} abas, com {len(periodos)} meses identificados "
+                    f"({mes_inicio:02d}/{ano_inicio} a {mes_fim:02d}/{ano_fim})")
     
     for sheet in sheets:
         sheet_id = sheet['id']
         sheet_name = sheet['name']
-        logging.info(f"Processando aba: {sheet_name} (ID: {sheet_id})")
+        logger.info(f"Processando aba: {sheet_name} (ID: {sheet_id})")
         records, summary, actual_name = sheets_processor.read_data(sheet_id)
         if not records:
-            logging.warning(f"Não foi possível extrair registros da aba {sheet_name}")
+            logger.warning(f"Não foi possível extrair registros da aba {sheet_name}")
             stats['falhas'] += 1
             continue
         
@@ -334,7 +349,7 @@ def process_all_sheets(sheets_url: str, site_name: str) -> Dict[str, int]:
         registros_por_data = {}
         for record in records:
             if not record.get('Data'):
-                logging.debug(f"Linha ignorada (sem Data): {record}")
+                logger.debug(f"Linha ignorada (sem Data): {record}")
                 continue
             data = record.get('Data')
             blocos = sheets_processor.extract_titles_and_fields(record)
@@ -345,102 +360,79 @@ def process_all_sheets(sheets_url: str, site_name: str) -> Dict[str, int]:
                 registros_por_data[data] = []
             
             for bloco in blocos:
-                bloco_copy = bloco.copy()
-                bloco_copy['pagina'] = pagina
-                registros_por_data[data].append(bloco_copy)
+                bloco['pagina'] = pagina
+                registros_por_data[data].append(bloco)
         
 
         config = db.get_site_config(site_name)
         sheet_url = config['sheet_url'] if config and config.get('sheet_url') else None
         webhook_url = config.get('slack_webhook_url')
-        print(f"DEBUG: config retornado para {site_name}: {config}")
-        print(f"DEBUG: webhook_url para {site_name}: {webhook_url}")
+        logger.debug("Configuração de %s: %s", site_name, config)
         if not sheet_url:
-            logging.warning(f"Site '{site_name}' sem sheet_url cadastrado! Pulando...")
+            logger.warning(f"Site '{site_name}' sem sheet_url cadastrado! Pulando...")
             stats['falhas'] += 1
             continue
         if not webhook_url:
-            logging.warning(f"Site '{site_name}' sem webhook do Slack cadastrado! Pulando...")
+            logger.warning(f"Site '{site_name}' sem webhook do Slack cadastrado! Pulando...")
             stats['falhas'] += 1
             continue
 
         for data in sorted(registros_por_data.keys()):
             blocos = registros_por_data[data]
             registro_id = f"{empresa}_{data}"
-            if data_manager.is_record_processed({'id': registro_id, 'titulo': empresa}, 'id'):
-                logging.info(f"Grupo já processado: {registro_id}")
+            registro = {
+                'id': registro_id,
+                'titulo': empresa,
+                'data': data,
+                'blocos': blocos,
+                'data_processamento': datetime.now().isoformat()
+            }
+            # Reserva o grupo antes do envio: outro processo rodando ao mesmo tempo não o envia de novo
+            try:
+                claimed = data_manager.claim_record(registro, key_field='id')
+            except sqlite3.Error as e:
+                logger.error(f"Erro ao reservar o grupo {registro_id}: {e}. Será tentado na próxima execução")
+                stats['falhas'] += 1
+                continue
+            if not claimed:
+                logger.info(f"Grupo já processado: {registro_id}")
                 stats['processadas'] += 1
                 continue
             
             mensagens = format_slack_message_empresa(empresa, data, blocos)
             sucesso = True
             for mensagem in mensagens:
-                logging.info(f"Preparando para enviar ao Slack: {mensagem}")
+                logger.info(f"Preparando para enviar ao Slack: {mensagem}")
                 if not send_to_slack(mensagem, webhook_url): 
                     sucesso = False
                     stats['falhas'] += 1
+            if not sucesso:
+                data_manager.release_record(registro, key_field='id')
 
             try:
-                sheets_processor = GoogleSheetsProcessor(sheet_url, site_name=site_name)
+                if sheet_url != sheets_processor.spreadsheet_url:
+                    sheets_processor = GoogleSheetsProcessor(sheet_url, site_name=site_name)
                 current_date = get_current_date_str()
+                current_day, current_month_num, _ = parse_sheet_date(current_date)
                 current_month = datetime.now().month
                 current_year = datetime.now().year
                 sheets = sheets_processor.get_sheet_ids()
                 if not sheets:
                     continue
-                site_investimento = 0.0
-                site_receita_real = 0.0
-                site_receita_dolar = 0.0
-                site_mc = 0.0
+                site_records = []
                 encontrou_registro = False
                 roas_lidos = []
                 retry_count = 0
                 max_retries = 12
-                for sheet in sheets:
+                for sheet in sheets_processor.get_sheets_for_month(current_year, current_month):
                     sheet_id = sheet['id']
                     records, summary, actual_name = sheets_processor.read_data(sheet_id)
                     if not records:
                         continue
                     pagina = actual_name or sheet['name']
-                    aba_mes_vigente = False
-                    for mes in ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]:
-                        if mes in pagina:
-                            mes_num = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"].index(mes) + 1
-                            if mes_num == current_month and str(current_year) in pagina:
-                                aba_mes_vigente = True
-                            break
-                    if not aba_mes_vigente:
-                        continue
-                    print(f"[DEBUG] Datas lidas na aba {pagina}: {[r.get('Data') for r in records]}")
-                    current_record = None
-                    for r in reversed(records):
-                        data_val = r.get('Data')
-                        if not data_val:
-                            continue
-                        data_val_str = str(data_val).strip()
-                        matched = False
-                        for fmt in ["%d/%m", "%d/%m/%Y", "%d/%m/%y", "%d-%m", "%d-%m-%Y", "%d-%m-%y"]:
-                            try:
-                                dt_val = datetime.strptime(re.sub(r'\\s+', '', data_val_str), fmt)
-                                dt_target = datetime.strptime(current_date, "%d/%m")
-                                if dt_val.day == dt_target.day and dt_val.month == dt_target.month:
-                                    matched = True
-                                    break
-                            except Exception:
-                                continue
-                        if not matched:
-                            try:
-                                parts = re.split(r'[/-]', data_val_str)
-                                if len(parts) >= 2:
-                                    d, m = int(parts[0]), int(parts[1])
-                                    dt_target = datetime.strptime(current_date, "%d/%m")
-                                    if d == dt_target.day and m == dt_target.month:
-                                        matched = True
-                            except Exception:
-                                pass
-                        if matched:
-                            current_record = r
-                            break
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Datas lidas na aba %s: %s", pagina, [r.get('Data') for r in records])
+                    current_record = records.find_by_date(current_day, current_month_num)
                     if not current_record:
                         continue
                     encontrou_registro = True
@@ -448,32 +440,32 @@ def process_all_sheets(sheets_url: str, site_name: str) -> Dict[str, int]:
                     receita = clean_value(current_record.get('Receita', '0,00'))
                     roas_geral = clean_value(current_record.get('ROAS Geral', '0,00'))
                     mc_geral = clean_value(current_record.get('MC Geral', '0,00'))
-                    print(f"Valores encontrados para {site_name}: Investimento={investimento}, Receita={receita}, ROAS={roas_geral}, MC={mc_geral}")
+                    logger.debug("Valores encontrados para %s: Investimento=%s, Receita=%s, ROAS=%s, MC=%s",
+                             site_name, investimento, receita, roas_geral, mc_geral)
                     
                     if is_data_zero_or_null(investimento, receita, roas_geral):
                         if retry_count < max_retries - 1: 
-                            logging.warning(f"Dados zerados/nulos para {site_name}. Tentativa {retry_count + 1}/{max_retries}. Aguardando 5 minutos para reprocessar...")
+                            logger.warning(f"Dados zerados/nulos para {site_name}. Tentativa {retry_count + 1}/{max_retries}. Aguardando 5 minutos para reprocessar...")
                             time.sleep(300)
                             retry = True
                             retry_count += 1
                             site_roas = '0,00'
                             break  
                         else:
-                            logging.warning(f"Dados continuam zerados/nulos após {max_retries} tentativas para {site_name}.")
+                            logger.warning(f"Dados continuam zerados/nulos após {max_retries} tentativas para {site_name}.")
                             send_to_slack(f":warning: Site {site_name} retornou dados zerados/nulos após {max_retries} tentativas.", webhook_url)
                     
-                    is_dolar = is_dollar_value(receita)
-                    print(f"[DEBUG] Receita '{receita}' detectada como {'DÓLAR' if is_dolar else 'REAL'}")
-                    
-                    site_investimento += to_float(investimento)
-                    if is_dolar:
-                        site_receita_dolar += to_float(receita)
-                    else:
-                        site_receita_real += to_float(receita)
-                    site_mc += to_float(mc_geral)
+                    site_records.append(current_record)
                     site_roas = roas_geral 
                     roas_lidos.append(to_float(roas_geral))
                     
+                # Soma os registros de todas as abas do mês de uma só vez
+                site_totals = sum_records(site_records)
+                site_investimento = site_totals['investimento']
+                site_receita_real = site_totals['receita_real']
+                site_receita_dolar = site_totals['receita_dolar']
+                site_mc = site_totals['mc']
+                
                 if site_investimento > 0 or site_receita_real > 0 or site_receita_dolar > 0 or encontrou_registro:
                     roas_geral_str = site_roas
                     
@@ -532,21 +524,15 @@ def process_all_sheets(sheets_url: str, site_name: str) -> Dict[str, int]:
                     send_to_slack(f"Erro ao enviar resumo: {e}", webhook_url)
 
             except Exception as e:
-                logging.error(f"Erro ao calcular/enviar resumo do grupo: {e}")
+                logger.error(f"Erro ao calcular/enviar resumo do grupo: {e}")
                 send_to_slack(f"Erro ao enviar resumo: {e}", webhook_url)
 
             if sucesso:
-                data_manager.mark_as_processed({
-                    'id': registro_id, 
-                    'titulo': empresa, 
-                    'data': data, 
-                    'blocos': blocos,
-                    'data_processamento': datetime.now().isoformat()
-                }, key_field='id')
-                logging.info(f"Grupo marcado como processado: {registro_id}")
+                logger.info(f"Grupo marcado como processado: {registro_id}")
                 stats['enviadas'] += 1
     
-    logging.info(f"Processamento de todas as abas concluído: {stats}")
+    data_manager.close()
+    logger.info(f"Processamento de todas as abas concluído: {stats}")
     return stats
 
 def exponential_backoff(attempt, max_backoff=60):
@@ -582,44 +568,242 @@ def is_data_zero_or_null(investimento, receita, roas_geral):
     
     return inv_zero and rec_zero and roas_zero
 
+def process_site_current_date(site_name: str, config: Dict[str, Any], webhook_url: str) -> Dict[str, Any]:
+    """
+    Lê a data atual de um site e prepara as mensagens de atualização, sem enviá-las.
+    Pode ser executada em paralelo para vários sites: o envio ao Slack e a soma dos
+    totais do canal ficam a cargo de quem chama, na ordem dos sites.
+    
+    Args:
+        site_name: Nome do site cadastrado no banco
+        config: Configuração do site (retorno de DBManager.get_site_config)
+        webhook_url: Webhook do canal do site
+        
+    Returns:
+        Dicionário com as mensagens a enviar (na ordem) e os totais do site
+    """
+    result = {
+        'site_name': site_name,
+        'messages': [],
+        'investimento': 0.0,
+        'receita_real': 0.0,
+        'receita_dolar': 0.0,
+        'mc': 0.0
+    }
+    roas_lidos = []
+    retry = True
+    retry_count = 0
+    max_retries = 12
+    while retry and retry_count < max_retries:
+        try:
+            sheet_url = config['sheet_url'] if config and config.get('sheet_url') else None
+            logger.debug("Configuração de %s: %s", site_name, config)
+            if not sheet_url:
+                logger.warning(f"Site '{site_name}' sem sheet_url cadastrado! Pulando...")
+                break
+            logger.info(f"Processando site: {site_name} ({sheet_url})")
+            sheets_processor = GoogleSheetsProcessor(sheet_url, site_name=site_name, site_config=config)
+
+            current_date = get_current_date_str()
+            current_day, current_month_num, _ = parse_sheet_date(current_date)
+            current_month = datetime.now().month
+            current_year = datetime.now().year
+            
+  
+            sheets = sheets_processor.get_sheet_ids()
+            if not sheets:
+                logger.warning(f"Nenhuma aba encontrada para {site_name}")
+                break
+                
+            site_records = []
+            encontrou_registro = False
+            
+
+            mes_vigente_sheets = sheets_processor.get_sheets_for_month(current_year, current_month)
+
+            if not mes_vigente_sheets and sheets:
+                mes_vigente_sheets = [sheets[0]]
+                logger.warning(f"Nenhuma aba do mês vigente encontrada para {site_name}. Usando a primeira aba.")
+                
+            # Lê todas as abas do mês vigente em uma única requisição
+            # O limitador de cota do processador já espera e repete as leituras em caso de 429
+            mes_vigente_ids = [sheet['id'] for sheet in mes_vigente_sheets]
+            try:
+                if SHEETS_NARROW_READS:
+                    batch_data = sheets_processor.read_data_narrow(mes_vigente_ids, day=int(current_date.split('/')[0]))
+                else:
+                    batch_data = sheets_processor.read_data_batch(mes_vigente_ids)
+            except Exception as e:
+                logger.error(f"Erro ao ler dados de {site_name}: {e}")
+                batch_data = {}
+                
+            for sheet in mes_vigente_sheets:
+                records, summary, actual_name = batch_data.get(str(sheet['id']), ([], {}, ""))
+                
+                if not records:
+                    logger.warning(f"Nenhum registro encontrado na aba {sheet['name']} de {site_name}")
+                    continue
+                    
+                pagina = actual_name or sheet['name']
+                aba_mes_vigente = True
+                
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Datas lidas na aba %s: %s", pagina, [r.get('Data') for r in records])
+                current_record = records.find_by_date(current_day, current_month_num)
+                if not current_record:
+                    logger.info(f"Nenhum registro encontrado para data {current_date} na aba {pagina} de {site_name}")
+                    continue
+                logger.debug("Registro de %s em %s, aba %s: %s", current_date, site_name, pagina, current_record)
+                encontrou_registro = True
+                investimento = clean_value(current_record.get('Investimento', '0,00'))
+                receita = clean_value(current_record.get('Receita', '0,00'))
+                roas_geral = clean_value(current_record.get('ROAS Geral', '0,00'))
+                mc_geral = clean_value(current_record.get('MC Geral', '0,00'))
+                logger.debug("Valores encontrados para %s: Investimento=%s, Receita=%s, ROAS=%s, MC=%s",
+                             site_name, investimento, receita, roas_geral, mc_geral)
+                
+                # Verifica se os dados são todos zeros ou nulos
+                if is_data_zero_or_null(investimento, receita, roas_geral):
+                    if retry_count < max_retries - 1:  # -1 pois ainda estamos na tentativa atual
+                        logger.warning(f"Dados zerados/nulos para {site_name}. Tentativa {retry_count + 1}/{max_retries}. Aguardando 5 minutos para reprocessar...")
+                        time.sleep(300)  # 5 minutos
+                        retry = True
+                        retry_count += 1
+                        site_roas = '0,00'  # Define valor default antes do break
+                        break  # Sai do loop da aba atual para reprocessar o site
+                    else:
+                        logger.warning(f"Dados continuam zerados/nulos após {max_retries} tentativas para {site_name}.")
+                        result['messages'].append(f":warning: Site {site_name} retornou dados zerados/nulos após {max_retries} tentativas.")
+                
+                site_records.append(current_record)
+                site_roas = roas_geral
+                roas_lidos.append(to_float(roas_geral))
+                
+            # Soma os registros de todas as abas do mês de uma só vez
+            site_totals = sum_records(site_records)
+            site_investimento = site_totals['investimento']
+            site_receita_real = site_totals['receita_real']
+            site_receita_dolar = site_totals['receita_dolar']
+            site_mc = site_totals['mc']
+            
+            if site_investimento > 0 or site_receita_real > 0 or site_receita_dolar > 0 or encontrou_registro:
+                roas_geral_str = site_roas
+                
+                if not roas_geral_str or roas_geral_str == '0,00':
+                    roas_geral_str = '0,00'
+                    
+                roas_emoji = get_roas_emoji(roas_geral_str)
+                mc_emoji = get_mc_emoji(str(site_mc))
+                
+                investimento_str = f"R$ {site_investimento:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+                receita_real_str = f"R$ {site_receita_real:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.') if site_receita_real > 0 else "R$ 0,00"
+                receita_dolar_str = f"$ {site_receita_dolar:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.') if site_receita_dolar > 0 else "$ 0,00"
+                
+                receipts_msg = ""
+                if site_receita_real > 0 and site_receita_dolar > 0:
+                    receipts_msg = f"Receita (R$): *{receita_real_str}*\nReceita ($): *{receita_dolar_str}*"
+                elif site_receita_real > 0:
+                    receipts_msg = f"Receita: *{receita_real_str}*"
+                elif site_receita_dolar > 0:
+                    receipts_msg = f"Receita: *{receita_dolar_str}*"
+                else:
+                    receipts_msg = "Receita: *R$ 0,00*"
+                    
+                msg = f":bar_chart: Atualização {site_name} {roas_emoji} {mc_emoji}\n" \
+                    f"Investimento: *{investimento_str}*\n" \
+                    f"{receipts_msg}\n" \
+                    f"ROAS: *{roas_geral_str}*\n" \
+                    f"MC: *{mc_geral}*"
+                result['messages'].append(msg)
+            
+            result['investimento'] += site_investimento
+            result['receita_real'] += site_receita_real
+            result['receita_dolar'] += site_receita_dolar
+            result['mc'] += site_mc
+            
+            if not encontrou_registro:
+                result['messages'].append(f":warning: Site {site_name} não teve dados para o dia {current_date}.")
+            
+            retry = False
+            
+        except Exception as e:
+            retry_count += 1
+            if 'RATE_LIMIT_EXCEEDED' in str(e) or '429' in str(e):
+                wait_time = exponential_backoff(retry_count)
+                logger.warning(f"Limite de requisições atingido para {site_name}. Aguardando {wait_time:.2f} segundos antes de tentar novamente...")
+                time.sleep(wait_time)
+            else:
+                logger.exception(f"Erro ao processar site {site_name}: {e}")
+                retry = False
+
+    return result
+
 def main():
     """Função principal do programa."""
     setup_logging()
+    started_at = time.perf_counter()
     os.makedirs('data', exist_ok=True)
-    db = DBManager()
+    db = create_db_manager()
     db.connect()
 
 
     parser = argparse.ArgumentParser(description='Processa dados do Google Sheets para Slack')
     parser.add_argument('--site', type=str, help='Nome do site a ser processado (opcional)')
+    parser.add_argument('--workers', type=int, default=SITE_WORKERS,
+                        help=f'Quantidade de sites processados em paralelo (padrão: {SITE_WORKERS})')
+    parser.add_argument('--digest', action='store_true', default=SLACK_DIGEST,
+                        help='Envia as atualizações e o resumo de cada canal em uma única mensagem')
+    parser.add_argument('--drain-outbox', action='store_true',
+                        help='Apenas reenvia as mensagens pendentes do outbox do Slack, sem ler as planilhas')
+    parser.add_argument('--compact-processed', action='store_true',
+                        help='Aplica a retenção e reduz os registros processados às chaves de duplicidade, sem ler as planilhas')
     args = parser.parse_args()
 
-    if args.site:
+    # --compact-processed é uma manutenção local: não abre o envio ao Slack nem reenvia o outbox
+    sends_messages = not args.compact_processed
+    delivery_queue = SlackDeliveryQueue(get_webhook_delivery()) if SLACK_ASYNC_DELIVERY and sends_messages else None
+    outbox = open_outbox(delivery_queue) if SLACK_OUTBOX_ENABLED and sends_messages else None
+    sender = outbox or delivery_queue
+    deduplicator = open_deduplicator() if SLACK_DEDUP_ENABLED and sends_messages else None
+    if outbox is not None:
+        # Mensagens que falharam ou ficaram pendentes em execuções anteriores vão antes das novas;
+        # seus grupos ficam registrados como enviados, para não serem montados e enviados de novo
+        outbox.drain(deduplicator)
+    # Grupos reservados no registro de envios: (webhook, mensagens, enviado, TrackingSender ou None)
+    claimed_groups = []
+
+    if args.drain_outbox:
+        if outbox is None:
+            logger.warning("Outbox do Slack desativado (SLACK_OUTBOX_ENABLED=false); nada a reenviar")
+    elif args.compact_processed:
+        data_manager = DataManager()
+        data_manager.apply_retention()
+        data_manager.compact()
+        data_manager.close()
+    elif args.site:
         site_name = args.site
         config = db.get_site_config(site_name)
         sheet_url = config['sheet_url'] if config and config.get('sheet_url') else None
         if not sheet_url:
-            print(f"Site '{site_name}' sem sheet_url cadastrado! Abortando...")
-            return
-        print(f"Processando site: {site_name} ({sheet_url})")
-        try:
-            process_current_date_only(sheet_url, site_name)
-        except Exception as e:
-            if 'RATE_LIMIT_EXCEEDED' in str(e) or '429' in str(e):
-                print("Limite de requisições atingido. Aguardando 60 segundos antes de tentar novamente...")
-                time.sleep(60)
-                try:
-                    process_current_date_only(sheet_url, site_name)
-                except Exception as e2:
-                    print(f"Erro ao processar site {site_name} após aguardar: {e2}")
-                    print(traceback.format_exc())
-            else:
-                print(f"Erro ao processar site {site_name}: {e}")
-                print(traceback.format_exc())
+            logger.warning(f"Site '{site_name}' sem sheet_url cadastrado! Abortando...")
+        else:
+            logger.info(f"Processando site: {site_name} ({sheet_url})")
+            try:
+                process_current_date_only(sheet_url, site_name)
+            except Exception as e:
+                if 'RATE_LIMIT_EXCEEDED' in str(e) or '429' in str(e):
+                    logger.warning("Limite de requisições atingido. Aguardando 60 segundos antes de tentar novamente...")
+                    time.sleep(60)
+                    try:
+                        process_current_date_only(sheet_url, site_name)
+                    except Exception as e2:
+                        logger.exception(f"Erro ao processar site {site_name} após aguardar: {e2}")
+                else:
+                    logger.exception(f"Erro ao processar site {site_name}: {e}")
     else:
         all_sites = db.get_all_sites()
-        print(f"\nIniciando processamento da data atual ({get_current_date_str()}) para todos os sites cadastrados...")
-        print("Pressione Ctrl+C para interromper o processamento.")
+        logger.info(f"Iniciando processamento da data atual ({get_current_date_str()}) para todos os sites cadastrados...")
+        logger.info("Pressione Ctrl+C para interromper o processamento.")
         total_investimento_geral = 0.0
         total_receita_geral = 0.0
         total_receita_dolar_geral = 0.0
@@ -629,261 +813,129 @@ def main():
         last_site_processed = False
         last_site = all_sites[-1] if all_sites else None
         
+        # As configurações são lidas aqui, na thread principal, porque a conexão
+        # com o MySQL não é compartilhada entre as threads de processamento.
+        site_configs = {}
         webhook_to_sites = {}
         for site_name in all_sites:
             config = db.get_site_config(site_name)
+            site_configs[site_name] = config
             webhook_url = config.get('slack_webhook_url')
             if not webhook_url:
                 continue
             webhook_to_sites.setdefault(webhook_url, []).append(site_name)
         
-        for webhook_url, sites in webhook_to_sites.items():
-            total_investimento = 0.0
-            total_receita_real = 0.0
-            total_receita_dolar = 0.0
-            total_mc = 0.0
-            sites_processados = 0
-            total_sites = len(sites)
-            roas_lidos = [] 
-            for site_name in sites:
-                retry = True
-                retry_count = 0
-                max_retries = 12
-                while retry and retry_count < max_retries:
+        # Os sites são processados em paralelo, mas as mensagens de cada canal são
+        # enviadas na ordem original dos sites, à medida que cada um termina.
+        # Com a supressão de repetições, as mensagens de cada canal são reunidas antes do
+        # envio para comparar o grupo inteiro com o último enviado ao canal
+        buffer_messages = args.digest or deduplicator is not None
+        current_date = get_current_date_str()
+        
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            futures = {}
+            for webhook_url, sites in webhook_to_sites.items():
+                for site_name in sites:
+                    futures[site_name] = executor.submit(process_site_current_date, site_name, site_configs[site_name], webhook_url)
+            
+            for webhook_url, sites in webhook_to_sites.items():
+                total_investimento = 0.0
+                total_receita_real = 0.0
+                total_receita_dolar = 0.0
+                total_mc = 0.0
+                channel_messages = []
+                for site_name in sites:
+                    config = site_configs[site_name]
                     try:
-                        config = db.get_site_config(site_name)
-                        sheet_url = config['sheet_url'] if config and config.get('sheet_url') else None
-                        print(f"DEBUG: config retornado para {site_name}: {config}")
-                        print(f"DEBUG: webhook_url para {site_name}: {webhook_url}")
-                        if not sheet_url:
-                            print(f"Site '{site_name}' sem sheet_url cadastrado! Pulando...")
-                            break
-                        print(f"Processando site: {site_name} ({sheet_url})")
-                        sheets_processor = GoogleSheetsProcessor(sheet_url, site_name=site_name)
-
-                        current_date = get_current_date_str()
-                        current_month = datetime.now().month
-                        current_year = datetime.now().year
-                        
-  
-                        sheets = None
-                        sheet_retry = 0
-                        while sheets is None and sheet_retry < 3:
-                            try:
-                                sheets = sheets_processor.get_sheet_ids()
-                                if not sheets:
-                                    print(f"Nenhuma aba encontrada para {site_name}")
-                                    break
-                            except Exception as e:
-                                sheet_retry += 1
-                                if 'RATE_LIMIT_EXCEEDED' in str(e) or '429' in str(e):
-                                    wait_time = exponential_backoff(sheet_retry)
-                                    print(f"Rate limit ao obter abas de {site_name}. Aguardando {wait_time:.2f}s (tentativa {sheet_retry}/3)")
-                                    time.sleep(wait_time)
-                                else:
-                                    raise
-                        
-                        if not sheets:
-                            break
-                            
-                        site_investimento = 0.0
-                        site_receita_real = 0.0
-                        site_receita_dolar = 0.0
-                        site_mc = 0.0
-                        encontrou_registro = False
-                        
-
-                        mes_vigente_sheets = []
-                        for sheet in sheets:
-                            sheet_name = sheet['name']
-                            for mes in ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]:
-                                if mes in sheet_name:
-                                    mes_num = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"].index(mes) + 1
-                                    if mes_num == current_month and str(current_year) in sheet_name:
-                                        mes_vigente_sheets.append(sheet)
-                                    break
-                        
-
-                        if not mes_vigente_sheets and sheets:
-                            mes_vigente_sheets = [sheets[0]]
-                            print(f"Nenhuma aba do mês vigente encontrada para {site_name}. Usando a primeira aba.")
-                            
-                        for sheet in mes_vigente_sheets:
-                            sheet_id = sheet['id']
-
-                            records = None
-                            summary = None
-                            actual_name = None
-                            read_retry = 0
-                            while records is None and read_retry < 3:
-                                try:
-                                    records, summary, actual_name = sheets_processor.read_data(sheet_id)
-                                except Exception as e:
-                                    read_retry += 1
-                                    if 'RATE_LIMIT_EXCEEDED' in str(e) or '429' in str(e):
-                                        wait_time = exponential_backoff(read_retry, max_backoff=30)
-                                        print(f"Rate limit ao ler dados de {site_name}, aba {sheet['name']}. Aguardando {wait_time:.2f}s (tentativa {read_retry}/3)")
-                                        time.sleep(wait_time)
-                                    else:
-                                        logging.error(f"Erro ao ler dados de {site_name}, aba {sheet['name']}: {e}")
-                                        break
-                            
-                            if not records:
-                                print(f"Nenhum registro encontrado na aba {sheet['name']} de {site_name}")
-                                continue
-                                
-                            pagina = actual_name or sheet['name']
-                            aba_mes_vigente = True
-                            
-                            print(f"[DEBUG] Datas lidas na aba {pagina}: {[r.get('Data') for r in records]}")
-                            current_record = None
-                            for r in reversed(records):
-                                data_val = r.get('Data')
-                                if not data_val:
-                                    continue
-                                data_val_str = str(data_val).strip()
-                                matched = False
-                                if data_val_str == current_date:
-                                    matched = True
-                                else:
-                                    for fmt in ["%d/%m", "%d/%m/%Y", "%d/%m/%y", "%d-%m", "%d-%m-%Y", "%d-%m-%y"]:
-                                        try:
-                                            dt_val = datetime.strptime(re.sub(r'\s+', '', data_val_str), fmt)
-                                            dt_target = datetime.strptime(current_date, "%d/%m")
-                                            if dt_val.day == dt_target.day and dt_val.month == dt_target.month:
-                                                matched = True
-                                                break
-                                        except Exception:
-                                            continue
-                                    if not matched:
-                                        try:
-                                            parts = re.split(r'[/-]', data_val_str)
-                                            if len(parts) >= 2:
-                                                d, m = int(parts[0]), int(parts[1])
-                                                dt_target = datetime.strptime(current_date, "%d/%m")
-                                                if d == dt_target.day and m == dt_target.month:
-                                                    matched = True
-                                        except Exception:
-                                            pass
-                                if matched:
-                                    current_record = r
-                                    print(f"Encontrou registro para {current_date} em {site_name}, aba {pagina}: {current_record}")
-                                    break
-                            if not current_record:
-                                print(f"Nenhum registro encontrado para data {current_date} na aba {pagina} de {site_name}")
-                                continue
-                            encontrou_registro = True
-                            investimento = clean_value(current_record.get('Investimento', '0,00'))
-                            receita = clean_value(current_record.get('Receita', '0,00'))
-                            roas_geral = clean_value(current_record.get('ROAS Geral', '0,00'))
-                            mc_geral = clean_value(current_record.get('MC Geral', '0,00'))
-                            print(f"Valores encontrados para {site_name}: Investimento={investimento}, Receita={receita}, ROAS={roas_geral}, MC={mc_geral}")
-                            
-                            # Verifica se os dados são todos zeros ou nulos
-                            if is_data_zero_or_null(investimento, receita, roas_geral):
-                                if retry_count < max_retries - 1:  # -1 pois ainda estamos na tentativa atual
-                                    logging.warning(f"Dados zerados/nulos para {site_name}. Tentativa {retry_count + 1}/{max_retries}. Aguardando 5 minutos para reprocessar...")
-                                    time.sleep(300)  # 5 minutos
-                                    retry = True
-                                    retry_count += 1
-                                    site_roas = '0,00'  # Define valor default antes do break
-                                    break  # Sai do loop da aba atual para reprocessar o site
-                                else:
-                                    logging.warning(f"Dados continuam zerados/nulos após {max_retries} tentativas para {site_name}.")
-                                    send_to_slack(f":warning: Site {site_name} retornou dados zerados/nulos após {max_retries} tentativas.", webhook_url)
-                            
-                            is_dolar = is_dollar_value(receita)
-                            print(f"[DEBUG] Receita '{receita}' detectada como {'DÓLAR' if is_dolar else 'REAL'}")
-                            
-                            site_investimento += to_float(investimento)
-                            if is_dolar:
-                                site_receita_dolar += to_float(receita)
-                            else:
-                                site_receita_real += to_float(receita)
-                            site_mc += to_float(mc_geral)
-                            site_roas = roas_geral
-                            roas_lidos.append(to_float(roas_geral))
-                            
-                        if site_investimento > 0 or site_receita_real > 0 or site_receita_dolar > 0 or encontrou_registro:
-                            roas_geral_str = site_roas
-                            
-                            if not roas_geral_str or roas_geral_str == '0,00':
-                                roas_geral_str = '0,00'
-                                
-                            roas_emoji = get_roas_emoji(roas_geral_str)
-                            mc_emoji = get_mc_emoji(str(site_mc))
-                            
-                            investimento_str = f"R$ {site_investimento:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                            receita_real_str = f"R$ {site_receita_real:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.') if site_receita_real > 0 else "R$ 0,00"
-                            receita_dolar_str = f"$ {site_receita_dolar:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.') if site_receita_dolar > 0 else "$ 0,00"
-                            
-                            receipts_msg = ""
-                            if site_receita_real > 0 and site_receita_dolar > 0:
-                                receipts_msg = f"Receita (R$): *{receita_real_str}*\nReceita ($): *{receita_dolar_str}*"
-                            elif site_receita_real > 0:
-                                receipts_msg = f"Receita: *{receita_real_str}*"
-                            elif site_receita_dolar > 0:
-                                receipts_msg = f"Receita: *{receita_dolar_str}*"
-                            else:
-                                receipts_msg = "Receita: *R$ 0,00*"
-                                
-                            msg = f":bar_chart: Atualização {site_name} {roas_emoji} {mc_emoji}\n" \
-                                f"Investimento: *{investimento_str}*\n" \
-                                f"{receipts_msg}\n" \
-                                f"ROAS: *{roas_geral_str}*\n" \
-                                f"MC: *{mc_geral}*"
-                            send_to_slack(msg, webhook_url)
-                        
-                        total_investimento += site_investimento
-                        total_receita_real += site_receita_real
-                        total_receita_dolar += site_receita_dolar
-                        total_mc += site_mc
-                        
-                        if not encontrou_registro:
-                            send_to_slack(f":warning: Site {site_name} não teve dados para o dia {current_date}.", webhook_url)
-                        
-                        sites_processados += 1
-                        if sites_processados < total_sites:
-                            pass
-                        
-                        retry = False
-                        
+                        result = futures[site_name].result()
                     except Exception as e:
-                        retry_count += 1
-                        if 'RATE_LIMIT_EXCEEDED' in str(e) or '429' in str(e):
-                            wait_time = exponential_backoff(retry_count)
-                            print(f"Limite de requisições atingido para {site_name}. Aguardando {wait_time:.2f} segundos antes de tentar novamente...")
-                            time.sleep(wait_time)
-                        else:
-                            print(f"Erro ao processar site {site_name}: {e}")
-                            print(traceback.format_exc())
-                            retry = False
-
-                wait_between_sites = random.uniform(3, 5)
-                print(f"Aguardando {wait_between_sites:.2f}s antes de processar o próximo site...")
-                time.sleep(wait_between_sites)
+                        logger.exception(f"Erro ao processar site {site_name}: {e}")
+                        continue
+                    if buffer_messages:
+                        channel_messages.extend(result['messages'])
+                    else:
+                        for msg in result['messages']:
+                            send_to_slack(msg, webhook_url, sender)
+                    total_investimento += result['investimento']
+                    total_receita_real += result['receita_real']
+                    total_receita_dolar += result['receita_dolar']
+                    total_mc += result['mc']
 
-            try:
-                roas_medio = (total_receita_real + total_receita_dolar) / total_investimento if total_investimento > 0 else 0.0
-                roas_medio_str = f"{roas_medio:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                investimento_str = f"R$ {total_investimento:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                receita_real_str = f"R$ {total_receita_real:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                receita_dolar_str = f"$ {total_receita_dolar:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                mc_str = f"R$ {total_mc:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                squad_name = config.get('squad_name')
-                resumo_title = f"*Resumo Squad {squad_name}:*" if squad_name else "*Resumo do canal:*"
-                resumo_msg = [
-                    resumo_title,
-                    f"Investimento total: {investimento_str}",
-                    f"Receita total em reais: {receita_real_str}",
-                    f"Receita total em dólares: {receita_dolar_str}",
-                    f"MC total: {mc_str}"
-                ]
-                resumo_final = "\n".join(resumo_msg)
-                send_to_slack('```========================= RESUMO =========================```', webhook_url)
-                send_to_slack(resumo_final, webhook_url)
-            except Exception as e:
-                send_to_slack(f"Erro ao enviar resumo do canal: {e}", webhook_url)
+                try:
+                    roas_medio = (total_receita_real + total_receita_dolar) / total_investimento if total_investimento > 0 else 0.0
+                    roas_medio_str = f"{roas_medio:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+                    investimento_str = f"R$ {total_investimento:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+                    receita_real_str = f"R$ {total_receita_real:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+                    receita_dolar_str = f"$ {total_receita_dolar:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+                    mc_str = f"R$ {total_mc:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+                    squad_name = config.get('squad_name')
+                    resumo_title = f"*Resumo Squad {squad_name}:*" if squad_name else "*Resumo do canal:*"
+                    resumo_msg = [
+                        resumo_title,
+                        f"Investimento total: {investimento_str}",
+                        f"Receita total em reais: {receita_real_str}",
+                        f"Receita total em dólares: {receita_dolar_str}",
+                        f"MC total: {mc_str}"
+                    ]
+                    resumo_final = "\n".join(resumo_msg)
+                    group = channel_messages + [resumo_final]
+                    if deduplicator is not None:
+                        if not deduplicator.claim(webhook_url, current_date, group):
+                            logger.info(f"Mensagens de {squad_name or 'canal sem squad'} iguais às últimas enviadas "
+                                        f"para {current_date}; envio suprimido")
+                            continue
+                        # O grupo fica reservado; a reserva é desfeita ao final se a entrega falhar e
+                        # as mensagens não tiverem ficado no outbox
+                        if outbox is not None:
+                            tracker = TrackingSender(sender, dedup_group=(current_date, content_hash(group)))
+                        else:
+                            tracker = TrackingSender(sender) if sender is not None else None
+                        claimed_groups.append([webhook_url, group, False, tracker])
+                        group_sender = tracker
+                    else:
+                        group_sender = sender
+                    if args.digest:
+                        enviado = send_digest_to_slack(channel_messages, resumo_final, webhook_url,
+                                                       resumo_title.strip('*:'), group_sender)
+                    else:
+                        enviado = all([send_to_slack(msg, webhook_url, group_sender) for msg in channel_messages])
+                        enviado &= send_to_slack('```========================= RESUMO =========================```',
+                                                 webhook_url, group_sender)
+                        enviado &= send_to_slack(resumo_final, webhook_url, group_sender)
+                    if deduplicator is not None:
+                        claimed_groups[-1][2] = enviado
+                except Exception as e:
+                    if args.digest:
+                        send_digest_to_slack(channel_messages + [f"Erro ao enviar resumo do canal: {e}"], None, webhook_url,
+                                             sender=sender)
+                    else:
+                        for msg in channel_messages:
+                            send_to_slack(msg, webhook_url, sender)
+                        send_to_slack(f"Erro ao enviar resumo do canal: {e}", webhook_url, sender)
+
+    if delivery_queue is not None:
+        delivery_queue.close()
+    if deduplicator is not None:
+        for webhook_url, group, enviado, tracker in claimed_groups:
+            if enviado and (tracker is None or tracker.delivered()):
+                continue
+            if outbox is not None and tracker is not None and tracker.futures:
+                # As mensagens que falharam continuam pendentes no outbox e serão reenviadas por ele;
+                # desfazer a reserva faria o grupo ser enviado de novo junto com elas
+                logger.warning(f"Falha ao entregar mensagens de {current_date} a um canal; "
+                               "as pendentes serão reenviadas pelo outbox na próxima execução")
+                continue
+            logger.warning(f"Falha ao entregar as mensagens de {current_date} a um canal; "
+                           "o grupo será enviado novamente na próxima execução")
+            deduplicator.release(webhook_url, current_date, group)
+        deduplicator.purge()
+        deduplicator.close()
+    if outbox is not None:
+        outbox.purge()
+        logger.info(f"Outbox do Slack: {outbox.counts()}")
+        outbox.close()
+    get_webhook_delivery().log_stats()
+    logger.info(f"Execução concluída em {time.perf_counter() - started_at:.2f}s")
 
 if __name__ == "__main__":
     if '--agendador' in sys.argv:
@@ -894,16 +946,15 @@ if __name__ == "__main__":
         from datetime import datetime
 
         def job():
-            print(f"[Agendador] Executando rotina em {datetime.now(pytz.timezone('America/Sao_Paulo')).strftime('%d/%m/%Y %H:%M')}")
+            logger.info(f"[Agendador] Executando rotina em {datetime.now(pytz.timezone('America/Sao_Paulo')).strftime('%d/%m/%Y %H:%M')}")
             # Lógica para evitar que execuções das 21:10 que falhem bloqueiem outras execuções agendadas
             try:
                 main()
             except Exception as e:
-                logging.error(f"Erro na execução agendada: {e}")
-                print(f"Erro na execução agendada: {e}")
-                print(traceback.format_exc())
+                logger.exception(f"Erro na execução agendada: {e}")
 
-        print("Agendador: executando às 00:10, 03:10, 06:10, 09:10, 12:10, 15:10, 18:10 e 21:10. Pressione Ctrl+C para sair.")
+        setup_logging()
+        logger.info("Agendador: executando às 00:10, 03:10, 06:10, 09:10, 12:10, 15:10, 18:10 e 21:10. Pressione Ctrl+C para sair.")
         for hour in range(0, 24, 3):
             schedule.every().day.at(f"{hour:02d}:10").do(job)
         while True:
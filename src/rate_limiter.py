@@ -0,0 +1,157 @@
+"""
+Controle de cota das APIs externas (token bucket).
+
+O limitador distribui as requisições ao longo do minuto em vez de deixá-las
+estourar a cota e depois esperar. Quando um 429 ainda chega, a taxa é reduzida
+pela metade e volta a subir aos poucos a cada requisição bem-sucedida.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import SHEETS_READS_PER_MINUTE, SHEETS_WORKER_PROCESSES
+
+logger = logging.getLogger('carga_slack.quota')
+
+MAX_RATE_LIMIT_RETRIES = 5
+
+class TokenBucket:
+    """
+    Token bucket thread-safe com taxa adaptativa.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None, name: str = 'api'):
+        """
+        Inicializa o limitador.
+
+        Args:
+            rate_per_minute: Quantidade de requisições permitidas por minuto
+            capacity: Rajada máxima permitida (padrão: 10% da taxa, no mínimo 1)
+            name: Nome usado nos logs
+        """
+        self.name = name
+        self.max_rate = rate_per_minute / 60.0
+        self.rate = self.max_rate
+        self.min_rate = self.max_rate / 8
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_minute / 10.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        """Adiciona os tokens acumulados desde a última atualização."""
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Bloqueia até haver tokens disponíveis e os consome.
+
+        Args:
+            tokens: Quantidade de tokens a consumir
+
+        Returns:
+            Tempo total de espera em segundos
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                else:
+                    wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def on_success(self) -> None:
+        """Recupera gradualmente a taxa após uma redução por 429."""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """
+        Reduz a taxa pela metade e pausa o bucket após receber um 429.
+
+        Args:
+            retry_after: Tempo sugerido pelo servidor (header Retry-After), em segundos
+        """
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+            pause = retry_after if retry_after is not None else 1.0 / self.rate
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+            logger.warning(
+                f"Limite de requisições ({self.name}) atingido. Pausando {pause:.1f}s; "
+                f"nova taxa: {self.rate * 60:.1f} req/min"
+            )
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Verifica se a exceção corresponde a um HTTP 429 / RATE_LIMIT_EXCEEDED."""
+    response = getattr(error, 'response', None)
+    if getattr(response, 'status_code', None) == 429:
+        return True
+    return 'RATE_LIMIT_EXCEEDED' in str(error) or '429' in str(error)
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Extrai o header Retry-After (em segundos) da resposta associada à exceção, se houver."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        value = headers.get('Retry-After')
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def call_with_rate_limit(limiter: TokenBucket, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Executa uma chamada de API respeitando o limitador e repetindo-a em caso de 429.
+
+    Args:
+        limiter: Limitador a ser usado
+        func: Função que faz a requisição
+        *args, **kwargs: Argumentos repassados à função
+
+    Returns:
+        Retorno da função
+    """
+    attempt = 0
+    while True:
+        limiter.acquire()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            attempt += 1
+            if not is_rate_limit_error(e) or attempt > MAX_RATE_LIMIT_RETRIES:
+                raise
+            limiter.on_rate_limited(get_retry_after(e))
+            continue
+        limiter.on_success()
+        return result
+
+_sheets_limiter = None
+_sheets_limiter_lock = threading.Lock()
+
+def get_sheets_limiter() -> TokenBucket:
+    """
+    Retorna o limitador de leituras do Google Sheets compartilhado pelo processo.
+    A cota por minuto é dividida entre os processos configurados em SHEETS_WORKER_PROCESSES.
+    """
+    global _sheets_limiter
+    with _sheets_limiter_lock:
+        if _sheets_limiter is None:
+            rate = SHEETS_READS_PER_MINUTE / max(1, SHEETS_WORKER_PROCESSES)
+            _sheets_limiter = TokenBucket(rate, name='Google Sheets')
+        return _sheets_limiter
@@ -0,0 +1,146 @@
+"""
+Normalização das datas da coluna "Data", índice de registros por data e
+classificação das abas por mês.
+"""
+
+import re
+from datetime import date
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+def parse_sheet_date(value: Any) -> Optional[Tuple[int, int, Optional[int]]]:
+    """
+    Converte o valor da coluna Data em (dia, mês, ano).
+
+    Aceita os formatos usados nas planilhas (DD/MM, DD/MM/AAAA, DD/MM/AA, DD-MM, ...),
+    ignorando espaços.
+
+    Args:
+        value: Valor da coluna Data
+
+    Returns:
+        Tupla (dia, mês, ano) com ano None quando ausente, ou None se o valor não for uma data
+    """
+    if not value:
+        return None
+    parts = re.split(r'[/-]', re.sub(r'\s+', '', str(value)))
+    if len(parts) < 2:
+        return None
+    try:
+        day, month = int(parts[0]), int(parts[1])
+    except ValueError:
+        return None
+    year = None
+    if len(parts) >= 3 and parts[2].isdigit():
+        year = int(parts[2])
+        if year < 100:
+            year += 2000
+    return day, month, year
+
+class DateIndex:
+    """
+    Índice (dia, mês[, ano]) -> posição do registro, construído uma única vez por aba.
+    Quando a mesma data aparece mais de uma vez, vale a última ocorrência.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        self._by_day_month: Dict[Tuple[int, int], int] = {}
+        self._by_full_date: Dict[Tuple[int, int, int], int] = {}
+        for position, record in enumerate(records):
+            parsed = parse_sheet_date(record.get('Data'))
+            if parsed is None:
+                continue
+            day, month, year = parsed
+            self._by_day_month[(day, month)] = position
+            if year is not None:
+                self._by_full_date[(day, month, year)] = position
+
+    def find(self, day: int, month: int, year: Optional[int] = None) -> Optional[int]:
+        """
+        Retorna a posição do registro da data informada.
+
+        Args:
+            day: Dia
+            month: Mês
+            year: Ano (opcional); só considera registros cuja data tem ano
+
+        Returns:
+            Posição do registro na lista ou None se não houver registro para a data
+        """
+        if year is not None:
+            return self._by_full_date.get((day, month, year))
+        return self._by_day_month.get((day, month))
+
+    def __len__(self) -> int:
+        return len(self._by_day_month)
+
+class RecordList(list):
+    """Lista de registros de uma aba acompanhada do seu índice de datas."""
+
+    def __init__(self, records: Iterable[Dict[str, Any]] = ()):
+        super().__init__(records)
+        self.date_index = DateIndex(self)
+
+    def find_by_date(self, day: int, month: int, year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Busca o registro de uma data em O(1).
+
+        Args:
+            day: Dia
+            month: Mês
+            year: Ano (opcional)
+
+        Returns:
+            Registro encontrado ou None
+        """
+        position = self.date_index.find(day, month, year)
+        return self[position] if position is not None else None
+
+MONTH_NAMES = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
+
+def parse_tab_period(title: str) -> Optional[Tuple[int, FrozenSet[int]]]:
+    """
+    Identifica o mês (e os anos) a que uma aba se refere pelo nome, ex.: "Maio 2025".
+
+    Args:
+        title: Nome da aba
+
+    Returns:
+        Tupla (mês, anos encontrados no nome) ou None se o nome não contém um mês
+    """
+    for month, name in enumerate(MONTH_NAMES, start=1):
+        if name in title:
+            years = frozenset(int(year) for year in re.findall(r'\d{4}', title))
+            return month, years
+    return None
+
+class TabCalendar:
+    """
+    Classifica as abas de uma planilha por (ano, mês) uma única vez, a partir dos nomes,
+    e responde quais abas cobrem um mês ou uma data com uma consulta ao dicionário.
+    """
+
+    def __init__(self, sheets: Iterable[Dict[str, Any]]):
+        """
+        Args:
+            sheets: Abas no formato retornado por GoogleSheetsProcessor.get_sheet_ids
+        """
+        self._by_period: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+        for sheet in sheets:
+            period = parse_tab_period(sheet['name'])
+            if period is None:
+                continue
+            month, years = period
+            for year in years:
+                self._by_period.setdefault((year, month), []).append(sheet)
+
+    def tabs_for(self, year: int, month: int) -> List[Dict[str, Any]]:
+        """Retorna as abas do mês/ano informado, na ordem da planilha."""
+        return list(self._by_period.get((year, month), []))
+
+    def tabs_for_date(self, value: date) -> List[Dict[str, Any]]:
+        """Retorna as abas que cobrem a data informada."""
+        return self.tabs_for(value.year, value.month)
+
+    def periods(self) -> List[Tuple[int, int]]:
+        """Retorna os períodos (ano, mês) com abas, em ordem cronológica (ex.: para reprocessamentos)."""
+        return sorted(self._by_period)
@@ -0,0 +1,111 @@
+"""
+Representação compacta das linhas lidas das planilhas.
+
+Cada linha vira um SheetRecord (com __slots__), que guarda os textos das colunas usadas
+e os valores numéricos já convertidos uma única vez por aba, de forma vetorizada.
+O registro continua acessível como dicionário (record.get('Investimento'),
+record['Data'], **record) pelos nomes de coluna usados no restante do projeto.
+"""
+
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from value_parser import parse_currency_column
+
+# Nome da coluna exposto nos registros -> atributo do SheetRecord
+FIELDS: Tuple[Tuple[str, str], ...] = (
+    ('Data', 'data'),
+    ('Investimento', 'investimento'),
+    ('Receita', 'receita'),
+    ('ROAS Geral', 'roas'),
+    ('MC Geral', 'mc'),
+)
+_ATTRIBUTES = dict(FIELDS)
+
+class SheetRecord:
+    """Linha de uma aba com os valores como lidos e os valores numéricos já convertidos."""
+
+    __slots__ = ('data', 'investimento', 'receita', 'roas', 'mc',
+                 'investimento_valor', 'receita_valor', 'receita_em_dolar', 'mc_valor')
+
+    def __init__(self, data: str, investimento: str, receita: str, roas: str, mc: str,
+                 investimento_valor: float = 0.0, receita_valor: float = 0.0,
+                 receita_em_dolar: bool = False, mc_valor: float = 0.0):
+        self.data = data
+        self.investimento = investimento
+        self.receita = receita
+        self.roas = roas
+        self.mc = mc
+        self.investimento_valor = investimento_valor
+        self.receita_valor = receita_valor
+        self.receita_em_dolar = receita_em_dolar
+        self.mc_valor = mc_valor
+
+    def get(self, key: str, default: Any = None) -> Any:
+        attribute = _ATTRIBUTES.get(key)
+        return getattr(self, attribute) if attribute else default
+
+    def __getitem__(self, key: str) -> Any:
+        attribute = _ATTRIBUTES.get(key)
+        if attribute is None:
+            raise KeyError(key)
+        return getattr(self, attribute)
+
+    def __contains__(self, key: object) -> bool:
+        return key in _ATTRIBUTES
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def keys(self) -> List[str]:
+        return [name for name, _ in FIELDS]
+
+    def values(self) -> List[Any]:
+        return [getattr(self, attribute) for _, attribute in FIELDS]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(name, getattr(self, attribute)) for name, attribute in FIELDS]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Retorna o registro como dicionário (apenas as colunas da planilha)."""
+        return dict(self.items())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, SheetRecord):
+            return self.items() == other.items()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+def build_records(datas: Sequence[str], investimentos: Sequence[str], receitas: Sequence[str],
+                  roas: Sequence[str], mcs: Sequence[str]) -> List[SheetRecord]:
+    """
+    Monta os registros de uma aba a partir das colunas, convertendo investimento,
+    receita e MC em uma única passada por coluna.
+
+    Args:
+        datas: Coluna Data
+        investimentos: Coluna de investimento
+        receitas: Coluna de receita
+        roas: Coluna de ROAS
+        mcs: Coluna de MC
+
+    Returns:
+        Lista de SheetRecord, na ordem das linhas
+    """
+    if not datas:
+        return []
+    investimento_valores, _ = parse_currency_column(investimentos)
+    receita_valores, receita_em_dolar = parse_currency_column(receitas)
+    mc_valores, _ = parse_currency_column(mcs)
+    return [
+        SheetRecord(datas[i], investimentos[i], receitas[i], roas[i], mcs[i],
+                    float(investimento_valores[i]), float(receita_valores[i]),
+                    bool(receita_em_dolar[i]), float(mc_valores[i]))
+        for i in range(len(datas))
+    ]
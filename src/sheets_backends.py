@@ -0,0 +1,220 @@
+"""
+Backends de acesso ao Google Sheets usados pelo GoogleSheetsProcessor.
+
+- GspreadBackend: acessa a API real (gspread), respeitando o limitador de cota.
+- RecordingBackend: acessa a API real e grava em disco cada resposta recebida.
+- LocalSheetsBackend: serve planilhas a partir de arquivos locais, seja uma gravação
+  feita pelo RecordingBackend (replay), seja uma fixture sintética com os valores
+  de cada aba.
+
+O arquivo local de uma planilha fica em <SHEETS_FIXTURES_DIR>/<id da planilha>.json:
+
+    {
+        "title": "Nome da planilha",
+        "modified_time": "2025-05-07T10:00:00.000Z",
+        "worksheets": [
+            {"title": "Maio 2025", "id": 123, "values": [["Data", ...], ...]}
+        ],
+        "responses": {"<chave da requisição>": [[...]]}
+    }
+
+"values" (valores completos da aba) e "responses" (respostas gravadas) são opcionais;
+as respostas gravadas têm prioridade e, na ausência delas, os intervalos pedidos são
+recortados de "values".
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from collections import namedtuple
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import SHEETS_BACKEND, SHEETS_FIXTURES_DIR
+from google_client import open_spreadsheet
+from rate_limiter import call_with_rate_limit, get_sheets_limiter
+
+logger = logging.getLogger('carga_slack.sheets')
+
+WorksheetInfo = namedtuple('WorksheetInfo', ['title', 'id'])
+
+def spreadsheet_id_from_url(spreadsheet_url: str) -> str:
+    """Extrai o ID da planilha de uma URL do Google Sheets."""
+    match = re.search(r'/d/([a-zA-Z0-9-_]+)', spreadsheet_url)
+    return match.group(1) if match else spreadsheet_url
+
+def request_key(ranges: List[str], params: Optional[Dict[str, Any]] = None) -> str:
+    """Chave que identifica uma leitura em lote (intervalos + parâmetros)."""
+    return json.dumps([ranges, params or {}], ensure_ascii=False)
+
+class GspreadBackend:
+    """Acesso à API real do Google Sheets via gspread."""
+
+    def __init__(self, spreadsheet_url: str, creds_path: str):
+        self.spreadsheet = open_spreadsheet(spreadsheet_url, creds_path)
+        self.limiter = get_sheets_limiter()
+        self.id = self.spreadsheet.id
+        self.title = self.spreadsheet.title
+
+    def list_worksheets(self) -> List[WorksheetInfo]:
+        """Lista as abas da planilha (nome e GID)."""
+        worksheets = call_with_rate_limit(self.limiter, self.spreadsheet.worksheets)
+        return [WorksheetInfo(ws.title, ws.id) for ws in worksheets]
+
+    def batch_get(self, ranges: List[str], params: Optional[Dict[str, Any]] = None) -> List[List[List[str]]]:
+        """Lê vários intervalos em uma requisição e retorna os valores de cada um, na ordem pedida."""
+        if params:
+            response = call_with_rate_limit(self.limiter, self.spreadsheet.values_batch_get, ranges, params=params)
+        else:
+            response = call_with_rate_limit(self.limiter, self.spreadsheet.values_batch_get, ranges)
+        value_ranges = response.get('valueRanges', [])
+        return [
+            value_ranges[i].get('values', []) if i < len(value_ranges) else []
+            for i in range(len(ranges))
+        ]
+
+    def modified_time(self) -> Optional[str]:
+        """Retorna o modifiedTime da planilha no Drive."""
+        get_last_update = getattr(self.spreadsheet, 'get_lastUpdateTime', None)
+        return get_last_update() if get_last_update else self.spreadsheet.lastUpdateTime
+
+class LocalSheetsBackend:
+    """Planilha servida a partir de um arquivo local (gravação ou fixture sintética)."""
+
+    def __init__(self, spreadsheet_url: str, fixtures_dir: str = SHEETS_FIXTURES_DIR):
+        self.id = spreadsheet_id_from_url(spreadsheet_url)
+        path = os.path.join(fixtures_dir, f"{self.id}.json")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Fixture da planilha {self.id} não encontrada em {path}")
+        with open(path, 'r') as f:
+            self.data = json.load(f)
+        self.title = self.data.get('title', self.id)
+        self._values = {ws['title']: ws.get('values') for ws in self.data.get('worksheets', [])}
+
+    def list_worksheets(self) -> List[WorksheetInfo]:
+        """Lista as abas da planilha (nome e GID)."""
+        return [WorksheetInfo(ws['title'], ws['id']) for ws in self.data.get('worksheets', [])]
+
+    def batch_get(self, ranges: List[str], params: Optional[Dict[str, Any]] = None) -> List[List[List[str]]]:
+        """Retorna a resposta gravada ou recorta os intervalos dos valores da fixture."""
+        recorded = self.data.get('responses', {}).get(request_key(ranges, params))
+        if recorded is not None:
+            return recorded
+        by_columns = (params or {}).get('majorDimension') == 'COLUMNS'
+        return [self._slice(a1_range, by_columns) for a1_range in ranges]
+
+    def modified_time(self) -> Optional[str]:
+        """Retorna o modifiedTime gravado na fixture."""
+        return self.data.get('modified_time')
+
+    def _slice(self, a1_range: str, by_columns: bool) -> List[List[str]]:
+        """Recorta um intervalo em notação A1 dos valores completos de uma aba."""
+        match = re.match(r"^'((?:[^']|'')*)'(?:!(.+))?$", a1_range)
+        if not match:
+            raise ValueError(f"Intervalo não suportado pela fixture: {a1_range}")
+        title = match.group(1).replace("''", "'")
+        values = self._values.get(title)
+        if values is None:
+            raise KeyError(f"Sem valores para o intervalo {a1_range} na fixture da planilha {self.id}")
+
+        first_row, last_row, first_col, last_col = 0, len(values), 0, None
+        if match.group(2):
+            ref = re.match(r'^([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$', match.group(2))
+            if not ref:
+                raise ValueError(f"Intervalo não suportado pela fixture: {a1_range}")
+            col1, row1, col2, row2 = ref.groups()
+            first_row = int(row1) - 1 if row1 else 0
+            last_row = int(row2) if row2 else (first_row + 1 if row1 and col2 is None else len(values))
+            if col1:
+                first_col = _column_index(col1)
+                last_col = _column_index(col2) + 1 if col2 else first_col + 1
+
+        rows = [row[first_col:last_col] for row in values[first_row:last_row]]
+        if by_columns:
+            width = max((len(row) for row in rows), default=0)
+            rows = [[row[c] if c < len(row) else '' for row in rows] for c in range(width)]
+        # Assim como a API, omite células vazias no fim de cada linha/coluna e linhas vazias no fim
+        rows = [_strip_trailing(row) for row in rows]
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+class RecordingBackend:
+    """Acessa a planilha real e grava as respostas para uso posterior com LocalSheetsBackend."""
+
+    _lock = threading.Lock()
+
+    def __init__(self, inner: GspreadBackend, fixtures_dir: str = SHEETS_FIXTURES_DIR):
+        self.inner = inner
+        self.id = inner.id
+        self.title = inner.title
+        os.makedirs(fixtures_dir, exist_ok=True)
+        self.path = os.path.join(fixtures_dir, f"{self.id}.json")
+
+    def _update(self, **changes) -> None:
+        """Mescla as alterações no arquivo de gravação da planilha."""
+        with self._lock:
+            data = {}
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+            data['title'] = self.title
+            responses = changes.pop('responses', {})
+            data.setdefault('responses', {}).update(responses)
+            data.update(changes)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def list_worksheets(self) -> List[WorksheetInfo]:
+        worksheets = self.inner.list_worksheets()
+        self._update(worksheets=[{'title': ws.title, 'id': ws.id} for ws in worksheets])
+        return worksheets
+
+    def batch_get(self, ranges: List[str], params: Optional[Dict[str, Any]] = None) -> List[List[List[str]]]:
+        values = self.inner.batch_get(ranges, params)
+        self._update(responses={request_key(ranges, params): values})
+        return values
+
+    def modified_time(self) -> Optional[str]:
+        modified_time = self.inner.modified_time()
+        self._update(modified_time=modified_time)
+        return modified_time
+
+def create_backend(spreadsheet_url: str, creds_path: str, backend: str = SHEETS_BACKEND):
+    """
+    Cria o backend configurado em SHEETS_BACKEND.
+
+    Args:
+        spreadsheet_url: URL da planilha do Google Sheets
+        creds_path: Caminho para o arquivo de credenciais JSON
+        backend: 'live' (API real), 'record' (API real + gravação) ou 'replay' (arquivos locais)
+
+    Returns:
+        Instância do backend
+    """
+    if backend == 'replay':
+        return LocalSheetsBackend(spreadsheet_url)
+    if backend == 'record':
+        return RecordingBackend(GspreadBackend(spreadsheet_url, creds_path))
+    if backend != 'live':
+        logger.warning(f"SHEETS_BACKEND desconhecido: {backend}. Usando a API real.")
+    return GspreadBackend(spreadsheet_url, creds_path)
+
+def _column_index(letters: str) -> int:
+    """Converte a letra de uma coluna na notação A1 em índice (base 0)."""
+    index = 0
+    for char in letters:
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+def _strip_trailing(row: List[str]) -> List[str]:
+    """Remove as células vazias do fim de uma linha."""
+    end = len(row)
+    while end and row[end - 1] == '':
+        end -= 1
+    return row[:end]
@@ -0,0 +1,65 @@
+import json
+import os
+import logging
+import sys
+import threading
+from typing import Dict, Any
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import SHEETS_SNAPSHOT_DIR
+
+logger = logging.getLogger('carga_slack.sheets')
+
+class SheetsSnapshotStore:
+    """
+    Guarda em disco a última leitura de cada planilha do Google Sheets, junto com o
+    modifiedTime do Drive no momento da leitura, para servir leituras repetidas sem
+    chamar a API enquanto a planilha não for editada.
+    """
+
+    def __init__(self, snapshot_dir: str = SHEETS_SNAPSHOT_DIR):
+        self.snapshot_dir = snapshot_dir
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+    def _snapshot_path(self, spreadsheet_id: str) -> str:
+        """Retorna o caminho do arquivo de snapshot de uma planilha."""
+        return os.path.join(self.snapshot_dir, f"{spreadsheet_id}.json")
+
+    def load(self, spreadsheet_id: str) -> Dict[str, Any]:
+        """
+        Carrega o snapshot de uma planilha.
+
+        Args:
+            spreadsheet_id: ID da planilha no Google Sheets
+
+        Returns:
+            Dicionário com modified_time, saved_at, worksheets e ranges, ou vazio se não houver snapshot
+        """
+        path = self._snapshot_path(spreadsheet_id)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.error(f"Erro ao ler snapshot da planilha {spreadsheet_id}: {e}")
+            return {}
+
+    def save(self, spreadsheet_id: str, snapshot: Dict[str, Any]) -> None:
+        """
+        Salva o snapshot de uma planilha (grava em arquivo temporário e renomeia).
+
+        Args:
+            spreadsheet_id: ID da planilha no Google Sheets
+            snapshot: Dicionário com modified_time, saved_at, worksheets e ranges
+        """
+        path = self._snapshot_path(spreadsheet_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Erro ao salvar snapshot da planilha {spreadsheet_id}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
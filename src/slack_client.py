@@ -1,22 +1,42 @@
 import logging
-from typing import Dict, Any, List
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import SLACK_BATCH_WORKERS, SLACK_MAX_RETRIES
+from rate_limiter import TokenBucket
+
+logger = logging.getLogger('carga_slack.slack')
+
+# Limites da Web API do Slack por método (chamadas por minuto). O chat.postMessage não
+# segue os tiers numerados: o limite é de cerca de 1 mensagem por segundo por canal.
+METHOD_RATE_LIMITS = {
+    'chat.postMessage': 60,
+}
+
+# Resultado do envio de um registro em send_batch
+BatchResult = namedtuple('BatchResult', ['index', 'channel', 'ok', 'ts', 'error', 'attempts'])
+
 class SlackClient:
     """
     Cliente para enviar mensagens ao Slack.
     """
     
-    def __init__(self, token: str, default_channel: str):
+    def __init__(self, token: str, default_channel: str, base_url: str = None):
         """
         Inicializa o cliente Slack.
         
         Args:
             token: Token de autenticação do Slack
             default_channel: Canal padrão para envio de mensagens
+            base_url: URL da API (opcional), ex.: o servidor local de slack_stub_server
         """
-        self.client = WebClient(token=token)
+        self.client = WebClient(token=token, base_url=base_url) if base_url else WebClient(token=token)
         self.default_channel = default_channel
     
     def send_message(self, text: str, channel: str = None) -> bool:
@@ -37,9 +57,20 @@ class SlackClient:
             )
             return True
         except SlackApiError as e:
-            logging.error(f"Erro ao enviar mensagem para o Slack: {e}")
+            logger.error(f"Erro ao enviar mensagem para o Slack: {e}")
             return False
     
+    @staticmethod
+    def format_record(record: Dict[str, Any], template: str = None) -> str:
+        """Formata um registro como texto de mensagem (template ou "*campo*: valor" por linha)."""
+        if not template:
+            message_parts = []
+            for key, value in record.items():
+                if value is not None:
+                    message_parts.append(f"*{key}*: {value}")
+            return "\n".join(message_parts)
+        return template.format(**record)
+
     def send_record_as_message(self, record: Dict[str, Any], channel: str = None, 
                                template: str = None) -> bool:
         """
@@ -54,38 +85,91 @@ class SlackClient:
             True se a mensagem foi enviada com sucesso, False caso contrário
         """
         try:
-            if not template:
-                message_parts = []
-                for key, value in record.items():
-                    if value is not None:
-                        message_parts.append(f"*{key}*: {value}")
-                
-                message = "\n".join(message_parts)
-            else:
-                message = template.format(**record)
-            
-            return self.send_message(message, channel)
+            return self.send_message(self.format_record(record, template), channel)
             
         except Exception as e:
-            logging.error(f"Erro ao formatar e enviar registro para o Slack: {e}")
+            logger.error(f"Erro ao formatar e enviar registro para o Slack: {e}")
             return False
             
     def send_batch(self, records: List[Dict[str, Any]], channel: str = None, 
-                  template: str = None) -> int:
+                  template: str = None, channel_field: str = None,
+                  max_workers: int = SLACK_BATCH_WORKERS,
+                  messages_per_minute: float = METHOD_RATE_LIMITS['chat.postMessage']) -> List[BatchResult]:
         """
         Envia múltiplos registros para o Slack.
         
+        Os canais são atendidos em paralelo; dentro de cada canal as mensagens saem na
+        ordem dos registros, no ritmo do limite do chat.postMessage. Respostas
+        "ratelimited" pausam o canal pelo Retry-After e a mensagem é reenviada.
+        
         Args:
             records: Lista de registros a serem enviados
             channel: Canal de destino (opcional)
             template: Template de formatação (opcional)
+            channel_field: Campo do registro com o canal de destino (opcional); o campo
+                não é incluído na mensagem
+            max_workers: Quantidade de canais atendidos ao mesmo tempo
+            messages_per_minute: Ritmo máximo por canal
             
         Returns:
-            Número de mensagens enviadas com sucesso
+            Um BatchResult por registro, na ordem dos registros
         """
-        success_count = 0
-        for record in records:
-            if self.send_record_as_message(record, channel, template):
-                success_count += 1
+        by_channel: Dict[str, List[Tuple[int, str]]] = {}
+        results: List[Optional[BatchResult]] = [None] * len(records)
+        for index, record in enumerate(records):
+            target = channel or self.default_channel
+            if channel_field:
+                target = record.get(channel_field) or target
+                record = {key: value for key, value in record.items() if key != channel_field}
+            try:
+                text = self.format_record(record, template)
+            except Exception as e:
+                logger.error(f"Erro ao formatar registro para o Slack: {e}")
+                results[index] = BatchResult(index, target, False, None, str(e), 0)
+                continue
+            by_channel.setdefault(target, []).append((index, text))
+        
+        if by_channel:
+            workers = max(1, min(max_workers, len(by_channel)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(self._send_channel, target, items, messages_per_minute)
+                    for target, items in by_channel.items()
+                ]
+                for future in futures:
+                    for result in future.result():
+                        results[result.index] = result
         
-        return success_count 
\ No newline at end of file
+        failures = sum(1 for result in results if not result.ok)
+        logger.info(f"Envio em lote concluído: {len(records) - failures} mensagens enviadas, "
+                    f"{failures} falhas, {len(by_channel)} canais")
+        return results
+
+    def _send_channel(self, channel: str, items: List[Tuple[int, str]],
+                      messages_per_minute: float) -> List[BatchResult]:
+        """Envia, em ordem, as mensagens de um canal."""
+        limiter = TokenBucket(messages_per_minute, capacity=1, name=f'Slack {channel}')
+        return [self._post_with_retry(limiter, channel, index, text) for index, text in items]
+
+    def _post_with_retry(self, limiter: TokenBucket, channel: str, index: int, text: str) -> BatchResult:
+        """Envia uma mensagem, repetindo-a quando o Slack responde "ratelimited"."""
+        attempts = 0
+        while True:
+            limiter.acquire()
+            attempts += 1
+            try:
+                response = self.client.chat_postMessage(channel=channel, text=text)
+            except SlackApiError as e:
+                error = e.response.get('error') if e.response is not None else str(e)
+                rate_limited = error == 'ratelimited' or getattr(e.response, 'status_code', None) == 429
+                if rate_limited and attempts <= SLACK_MAX_RETRIES:
+                    retry_after = e.response.headers.get('Retry-After') if e.response is not None else None
+                    limiter.on_rate_limited(float(retry_after) if retry_after else None)
+                    continue
+                logger.error(f"Erro ao enviar mensagem para o Slack (canal {channel}): {error}")
+                return BatchResult(index, channel, False, None, error, attempts)
+            except Exception as e:
+                logger.error(f"Erro ao enviar mensagem para o Slack (canal {channel}): {e}")
+                return BatchResult(index, channel, False, None, str(e), attempts)
+            limiter.on_success()
+            return BatchResult(index, channel, True, response.get('ts'), None, attempts)
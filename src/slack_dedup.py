@@ -0,0 +1,121 @@
+"""
+Supressão de envios repetidos ao Slack.
+
+Guarda, por canal (webhook) e data, o hash do último grupo de mensagens enviado. Se a
+execução seguinte produzir exatamente as mesmas mensagens para o mesmo canal e data
+dentro da janela configurada, o envio é suprimido.
+
+O grupo é reservado (claim) antes do envio, em uma única instrução, então duas execuções
+simultâneas não enviam o mesmo grupo; se a entrega falhar, a reserva é desfeita (release).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import SLACK_DEDUP_FILE, SLACK_DEDUP_WINDOW_HOURS
+
+logger = logging.getLogger('carga_slack.slack')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sent_groups (
+    channel_key TEXT NOT NULL,
+    date TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    sent_at REAL NOT NULL,
+    PRIMARY KEY (channel_key, date)
+);
+"""
+
+def _channel_key(webhook_url: str) -> str:
+    """Identifica o canal sem gravar a URL do webhook (que funciona como credencial)."""
+    return hashlib.sha256(webhook_url.encode('utf-8')).hexdigest()
+
+def content_hash(messages: List[str]) -> str:
+    """Hash de um grupo de mensagens, na ordem de envio."""
+    return hashlib.sha256(json.dumps(messages, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+class MessageDeduplicator:
+    """Registro dos grupos de mensagens já enviados por canal e data."""
+
+    def __init__(self, path: str = SLACK_DEDUP_FILE, window_hours: float = SLACK_DEDUP_WINDOW_HOURS):
+        """
+        Args:
+            path: Arquivo SQLite do registro
+            window_hours: Janela (em horas) durante a qual um grupo idêntico não é reenviado
+        """
+        self.window = window_hours * 3600
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def claim(self, webhook_url: str, date: str, messages: List[str]) -> bool:
+        """
+        Reserva o envio do grupo de mensagens ao canal para a data.
+
+        A verificação e o registro são uma única instrução: o registro só é gravado (ou
+        substituído) se o último grupo do canal para a data não for idêntico a este dentro
+        da janela.
+
+        Returns:
+            True se o grupo deve ser enviado; False se é repetido
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO sent_groups (channel_key, date, content_hash, sent_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (channel_key, date) DO UPDATE SET "
+                "content_hash = excluded.content_hash, sent_at = excluded.sent_at "
+                "WHERE NOT (sent_groups.content_hash = excluded.content_hash AND sent_groups.sent_at > ?)",
+                (_channel_key(webhook_url), date, content_hash(messages), now, now - self.window)
+            )
+            return cursor.rowcount > 0
+
+    def mark_delivered(self, webhook_url: str, date: str, group_hash: str) -> None:
+        """
+        Registra como enviado um grupo reenviado pelo outbox (pelo hash, ver content_hash).
+        Não substitui o registro de um grupo diferente enviado depois ao mesmo canal e data.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sent_groups (channel_key, date, content_hash, sent_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (channel_key, date) DO UPDATE SET sent_at = excluded.sent_at "
+                "WHERE sent_groups.content_hash = excluded.content_hash",
+                (_channel_key(webhook_url), date, group_hash, time.time())
+            )
+
+    def release(self, webhook_url: str, date: str, messages: List[str]) -> None:
+        """Desfaz a reserva de um grupo cuja entrega falhou, para que seja enviado de novo."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM sent_groups WHERE channel_key = ? AND date = ? AND content_hash = ?",
+                (_channel_key(webhook_url), date, content_hash(messages))
+            )
+
+    def purge(self, older_than_days: int = 7) -> int:
+        """Remove registros enviados há mais de older_than_days dias."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM sent_groups WHERE sent_at < ?", (time.time() - older_than_days * 86400,)
+            )
+            return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def open_deduplicator(path: str = SLACK_DEDUP_FILE):
+    """Abre o registro de envios; se não for possível, registra o erro e segue sem supressão."""
+    try:
+        return MessageDeduplicator(path)
+    except sqlite3.Error as e:
+        logger.error(f"Erro ao abrir o registro de envios do Slack em {path}: {e}. Enviando sem supressão.")
+        return None
@@ -0,0 +1,171 @@
+"""
+Entrega das mensagens aos webhooks do Slack.
+
+WebhookDelivery mantém uma sessão HTTP (keep-alive, com pool de conexões) por host de
+webhook, aplica timeouts de conexão e de leitura e registra a latência de cada envio.
+LocalDelivery grava as mensagens em SLACK_LOCAL_FILE em vez de enviá-las
+(SLACK_BACKEND='local').
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import (
+    SLACK_BACKEND,
+    SLACK_CONNECT_TIMEOUT,
+    SLACK_LOCAL_FILE,
+    SLACK_POOL_SIZE,
+    SLACK_READ_TIMEOUT
+)
+
+logger = logging.getLogger('carga_slack.slack')
+
+# Resultado de um envio: ok, status HTTP (None se a requisição falhou), corpo da resposta,
+# latência em segundos e Retry-After (segundos) informado pelo Slack, se houver
+DeliveryResult = namedtuple('DeliveryResult', ['ok', 'status_code', 'body', 'elapsed', 'retry_after'])
+
+class WebhookDelivery:
+    """Envia payloads aos webhooks do Slack reaproveitando conexões por host."""
+
+    def __init__(self, connect_timeout: float = SLACK_CONNECT_TIMEOUT, read_timeout: float = SLACK_READ_TIMEOUT,
+                 pool_size: int = SLACK_POOL_SIZE):
+        """
+        Args:
+            connect_timeout: Tempo máximo para abrir a conexão, em segundos
+            read_timeout: Tempo máximo de espera pela resposta, em segundos
+            pool_size: Conexões mantidas abertas por host
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        self._sessions: Dict[str, requests.Session] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _session(self, host: str) -> requests.Session:
+        """Retorna a sessão do host, criando-a no primeiro envio."""
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({'Content-type': 'application/json'})
+                self._sessions[host] = session
+            return session
+
+    def post(self, webhook_url: str, payload: Dict[str, Any]) -> DeliveryResult:
+        """
+        Envia um payload ao webhook.
+
+        Args:
+            webhook_url: Webhook de destino
+            payload: Corpo da mensagem (ex.: {"text": "..."})
+
+        Returns:
+            DeliveryResult do envio
+        """
+        host = urlsplit(webhook_url).netloc
+        started_at = time.perf_counter()
+        try:
+            response = self._session(host).post(webhook_url, json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            elapsed = time.perf_counter() - started_at
+            self._record(host, elapsed)
+            logger.error(f"Exceção ao enviar mensagem ao Slack ({host}) após {elapsed * 1000:.0f} ms: {e}")
+            return DeliveryResult(False, None, str(e), elapsed, None)
+
+        elapsed = time.perf_counter() - started_at
+        self._record(host, elapsed)
+        logger.info(f"Resposta do Slack: status={response.status_code}, body={response.text}, "
+                    f"latência={elapsed * 1000:.0f} ms")
+        return DeliveryResult(response.status_code == 200, response.status_code, response.text, elapsed,
+                              _parse_retry_after(response.headers.get('Retry-After')))
+
+    def _record(self, host: str, elapsed: float) -> None:
+        """Acumula a latência do envio nas estatísticas do host."""
+        with self._lock:
+            stats = self._stats.setdefault(host, {'count': 0, 'total': 0.0, 'max': 0.0})
+            stats['count'] += 1
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], elapsed)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Retorna, por host, a quantidade de envios e a latência total e máxima (segundos)."""
+        with self._lock:
+            return {host: dict(values) for host, values in self._stats.items()}
+
+    def log_stats(self) -> None:
+        """Registra o resumo de latência dos envios por host."""
+        for host, stats in self.stats().items():
+            logger.info(f"Slack ({host}): {stats['count']} envios, latência média "
+                        f"{stats['total'] / stats['count'] * 1000:.0f} ms, máxima {stats['max'] * 1000:.0f} ms")
+
+    def close(self) -> None:
+        """Fecha as sessões abertas."""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+class LocalDelivery:
+    """Grava as mensagens em um arquivo JSON por linha em vez de enviá-las."""
+
+    def __init__(self, path: str = SLACK_LOCAL_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def post(self, webhook_url: str, payload: Dict[str, Any]) -> DeliveryResult:
+        """Grava o payload e o webhook de destino em SLACK_LOCAL_FILE."""
+        started_at = time.perf_counter()
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({
+                    'webhook_url': webhook_url,
+                    'payload': payload,
+                    'timestamp': datetime.now().isoformat()
+                }, ensure_ascii=False) + "\n")
+        except Exception as e:
+            logger.error(f"Erro ao gravar mensagem local do Slack: {e}")
+            return DeliveryResult(False, None, str(e), time.perf_counter() - started_at, None)
+        return DeliveryResult(True, 200, 'ok', time.perf_counter() - started_at, None)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {}
+
+    def log_stats(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Converte o header Retry-After em segundos."""
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+_delivery = None
+_delivery_lock = threading.Lock()
+
+def get_webhook_delivery():
+    """Retorna o entregador configurado em SLACK_BACKEND, compartilhado pelo processo."""
+    global _delivery
+    with _delivery_lock:
+        if _delivery is None:
+            _delivery = LocalDelivery() if SLACK_BACKEND == 'local' else WebhookDelivery()
+        return _delivery
@@ -0,0 +1,63 @@
+"""
+Modo resumo (digest) do envio ao Slack.
+
+Junta as atualizações de todos os sites de um canal e o resumo do canal em uma única
+mensagem com Block Kit, dividida em mais de uma apenas quando os limites do Slack
+exigem (50 blocos por mensagem e 3000 caracteres por bloco de texto).
+"""
+
+from typing import Any, Dict, List, Optional
+
+MAX_BLOCKS_PER_MESSAGE = 50
+MAX_SECTION_TEXT = 3000
+
+def _section(text: str) -> Dict[str, Any]:
+    return {'type': 'section', 'text': {'type': 'mrkdwn', 'text': text}}
+
+def _split_text(text: str, limit: int = MAX_SECTION_TEXT) -> List[str]:
+    """Divide um texto em partes de até `limit` caracteres, preferindo quebrar entre linhas."""
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind('\n', 0, limit)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut])
+        text = text[cut:].lstrip('\n')
+    if text:
+        parts.append(text)
+    return parts
+
+def build_digest_payloads(messages: List[str], summary: Optional[str] = None,
+                          fallback_text: str = 'Atualização dos sites',
+                          max_blocks: int = MAX_BLOCKS_PER_MESSAGE) -> List[Dict[str, Any]]:
+    """
+    Monta os payloads do webhook para as mensagens de um canal.
+
+    Args:
+        messages: Mensagens dos sites, na ordem de envio
+        summary: Resumo do canal, enviado após um divisor (opcional)
+        fallback_text: Texto usado nas notificações (campo "text" do payload)
+        max_blocks: Quantidade máxima de blocos por mensagem
+
+    Returns:
+        Lista de payloads ({"text": ..., "blocks": [...]}); vazia se não houver mensagens
+    """
+    blocks = []
+    for message in messages:
+        blocks.extend(_section(part) for part in _split_text(message))
+    if summary:
+        if blocks:
+            blocks.append({'type': 'divider'})
+        blocks.extend(_section(part) for part in _split_text(summary))
+
+    payloads = []
+    for start in range(0, len(blocks), max_blocks):
+        chunk = blocks[start:start + max_blocks]
+        # Um divisor no início ou no fim de uma parte não separa nada
+        while chunk and chunk[-1]['type'] == 'divider':
+            chunk.pop()
+        while chunk and chunk[0]['type'] == 'divider':
+            chunk.pop(0)
+        if chunk:
+            payloads.append({'text': fallback_text, 'blocks': chunk})
+    return payloads
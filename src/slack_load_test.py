@@ -0,0 +1,91 @@
+"""
+Teste de carga do envio ao Slack contra o servidor local (slack_stub_server).
+
+Envia N mensagens distribuídas entre K webhooks (ou canais, no modo bot) e mede o
+tempo total, a vazão e as respostas do servidor (aceitas, 429 e 5xx).
+
+Exemplos:
+    # servidor embutido, 1 msg/s por webhook como o Slack, 150 ms de latência
+    python src/slack_load_test.py --messages 60 --webhooks 6 --latency-ms 150 --per-hook-rate 1
+
+    # envio síncrono (como o send_to_slack sem fila), para comparação
+    python src/slack_load_test.py --mode sync --messages 60 --webhooks 6 --latency-ms 150
+
+    # contra um servidor já em execução
+    python src/slack_load_test.py --url http://127.0.0.1:8099 --messages 100
+"""
+
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import SLACK_MESSAGES_PER_MINUTE
+from slack_client import SlackClient
+from slack_delivery import WebhookDelivery
+from slack_queue import SlackDeliveryQueue
+from slack_stub_server import SlackStubServer, build_parser
+
+logger = logging.getLogger('carga_slack.slack')
+
+def run_webhooks(base_url: str, messages: int, webhooks: int, mode: str, messages_per_minute: float) -> int:
+    """Envia as mensagens pelos webhooks e retorna quantas foram aceitas."""
+    delivery = WebhookDelivery()
+    hooks = [f"{base_url}/services/T000/B{i:03d}/load" for i in range(webhooks)]
+    if mode == 'sync':
+        ok = sum(delivery.post(hooks[i % webhooks], {'text': f"Mensagem {i}"}).ok for i in range(messages))
+    else:
+        delivery_queue = SlackDeliveryQueue(delivery, messages_per_minute)
+        futures = [delivery_queue.submit(hooks[i % webhooks], {'text': f"Mensagem {i}"}) for i in range(messages)]
+        delivery_queue.close()
+        ok = sum(future.result().ok for future in futures)
+    delivery.log_stats()
+    delivery.close()
+    return ok
+
+def run_bot(base_url: str, messages: int, channels: int, messages_per_minute: float) -> int:
+    """Envia as mensagens pelo chat.postMessage (SlackClient.send_batch) e retorna quantas foram aceitas."""
+    client = SlackClient('xoxb-load-test', 'C000', base_url=f"{base_url}/api/")
+    records = [{'canal': f"C{i % channels:03d}", 'Mensagem': i} for i in range(messages)]
+    results = client.send_batch(records, channel_field='canal', messages_per_minute=messages_per_minute)
+    return sum(result.ok for result in results)
+
+def main():
+    parser = build_parser()
+    parser.description = 'Teste de carga do envio ao Slack'
+    parser.set_defaults(port=0)
+    parser.add_argument('--url', default=None, help='Servidor já em execução (padrão: inicia um servidor embutido)')
+    parser.add_argument('--messages', type=int, default=50)
+    parser.add_argument('--webhooks', type=int, default=5, help='Quantidade de webhooks (ou canais, no modo bot)')
+    parser.add_argument('--mode', choices=['queue', 'sync', 'bot'], default='queue')
+    parser.add_argument('--messages-per-minute', type=float, default=SLACK_MESSAGES_PER_MINUTE,
+                        help='Ritmo por webhook (modo queue) ou por canal (modo bot)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logging.getLogger('carga_slack.quota').setLevel(logging.WARNING)
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server = SlackStubServer(args.host, args.port, args.latency_ms, args.jitter_ms, args.rate_limit_rate,
+                                 args.per_hook_rate, args.retry_after, args.error_rate, args.record_file,
+                                 args.seed).start()
+        base_url = server.url
+
+    started_at = time.perf_counter()
+    if args.mode == 'bot':
+        ok = run_bot(base_url, args.messages, args.webhooks, args.messages_per_minute)
+    else:
+        ok = run_webhooks(base_url, args.messages, args.webhooks, args.mode, args.messages_per_minute)
+    elapsed = time.perf_counter() - started_at
+
+    print(f"Modo {args.mode}: {ok}/{args.messages} mensagens aceitas em {elapsed:.2f}s "
+          f"({ok / elapsed if elapsed else 0:.1f} msg/s)")
+    if server is not None:
+        print(f"Respostas do servidor: {server.counts}")
+        server.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""
+Outbox persistente das mensagens do Slack (SQLite).
+
+Cada mensagem renderizada é gravada no outbox antes do envio e marcada como enviada
+quando o Slack confirma o recebimento. Mensagens que falharam (ou que ficaram pendentes
+por uma interrupção do processo) são reenviadas na próxima execução, sem reler as
+planilhas. A entrega é "pelo menos uma vez": se o processo cair entre o envio e a
+confirmação, a mensagem é reenviada.
+
+Cada mensagem em envio fica reservada no banco (status 'sending', com o processo dono e
+o prazo da reserva), então um drain em outro processo (ex.: cron junto do --agendador)
+não reenvia mensagens que ainda estão sendo enviadas; só as reservas vencidas são
+retomadas.
+
+Mensagens de um grupo controlado pelo registro de envios (slack_dedup) guardam a data e
+o hash do grupo; ao reenviá-las, drain atualiza o registro, para que a execução não
+monte e envie o mesmo grupo outra vez.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import (
+    SLACK_OUTBOX_FILE,
+    SLACK_OUTBOX_LEASE_SECONDS,
+    SLACK_OUTBOX_MAX_ATTEMPTS,
+    SLACK_OUTBOX_RETENTION_DAYS
+)
+from slack_delivery import DeliveryResult, get_webhook_delivery
+
+logger = logging.getLogger('carga_slack.slack')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    webhook_url TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TEXT NOT NULL,
+    sent_at TEXT,
+    owner TEXT,
+    lease_until REAL,
+    dedup_group TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox (status, id);
+"""
+
+class SlackOutbox:
+    """
+    Grava as mensagens antes de enviá-las e acompanha o resultado de cada envio.
+
+    Tem a mesma interface de envio da SlackDeliveryQueue (submit), à qual repassa as
+    mensagens; sem fila, envia de forma síncrona.
+    """
+
+    def __init__(self, delivery_queue=None, path: str = SLACK_OUTBOX_FILE,
+                 max_attempts: int = SLACK_OUTBOX_MAX_ATTEMPTS, lease_seconds: float = SLACK_OUTBOX_LEASE_SECONDS):
+        """
+        Args:
+            delivery_queue: Fila de entrega (opcional)
+            path: Arquivo SQLite do outbox
+            max_attempts: Execuções em que uma mensagem é tentada antes de ser descartada
+            lease_seconds: Prazo da reserva de uma mensagem em envio por este processo
+        """
+        self.delivery_queue = delivery_queue
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # isolation_level=None: as transações são abertas explicitamente em _transaction()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA busy_timeout = 30000")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._lock = threading.Lock()
+        self._conn.executescript(SCHEMA)
+        with self._lock, self._transaction():
+            columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+            for column, kind in (('owner', 'TEXT'), ('lease_until', 'REAL'), ('dedup_group', 'TEXT')):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE outbox ADD COLUMN {column} {kind}")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Transação de gravação (BEGIN IMMEDIATE): outro processo espera em vez de gravar por cima."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conn
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def add(self, webhook_url: str, payload: Dict[str, Any], dedup_group: Optional[Tuple[str, str]] = None) -> int:
+        """
+        Grava uma mensagem já reservada para envio por este processo e retorna seu ID.
+
+        Args:
+            webhook_url: Webhook de destino
+            payload: Payload da mensagem
+            dedup_group: (data, hash do grupo) no registro de envios, se a mensagem faz parte de um grupo
+        """
+        with self._lock, self._transaction():
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (webhook_url, payload, status, created_at, owner, lease_until, dedup_group) "
+                "VALUES (?, ?, 'sending', ?, ?, ?, ?)",
+                (webhook_url, json.dumps(payload, ensure_ascii=False), datetime.now().isoformat(),
+                 self.owner, time.time() + self.lease_seconds, json.dumps(dedup_group) if dedup_group else None)
+            )
+            return cursor.lastrowid
+
+    def submit(self, webhook_url: str, payload: Dict[str, Any],
+               dedup_group: Optional[Tuple[str, str]] = None) -> Future:
+        """
+        Grava a mensagem no outbox e a envia.
+
+        Returns:
+            Future resolvido com o DeliveryResult do envio
+        """
+        return self._send(self.add(webhook_url, payload, dedup_group), webhook_url, payload)
+
+    def _send(self, message_id: int, webhook_url: str, payload: Dict[str, Any]) -> Future:
+        """Envia uma mensagem já reservada por este processo e registra o resultado quando ele chegar."""
+        if self.delivery_queue is not None:
+            future = self.delivery_queue.submit(webhook_url, payload)
+        else:
+            future = Future()
+            try:
+                future.set_result(get_webhook_delivery().post(webhook_url, payload))
+            except Exception as e:
+                future.set_result(DeliveryResult(False, None, str(e), 0.0, None))
+        future.add_done_callback(lambda done: self._on_result(message_id, done.result()))
+        return future
+
+    def _on_result(self, message_id: int, result: DeliveryResult) -> None:
+        """Marca a mensagem como enviada ou registra a falha, liberando a reserva."""
+        with self._lock, self._transaction():
+            if result.ok:
+                self._conn.execute(
+                    "UPDATE outbox SET status = 'sent', attempts = attempts + 1, sent_at = ?, "
+                    "owner = NULL, lease_until = NULL WHERE id = ?",
+                    (datetime.now().isoformat(), message_id)
+                )
+            else:
+                # Se a reserva venceu e outro processo retomou a mensagem, o resultado é dele
+                self._conn.execute(
+                    "UPDATE outbox SET attempts = attempts + 1, last_error = ?, owner = NULL, lease_until = NULL, "
+                    "status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END "
+                    "WHERE id = ? AND owner = ?",
+                    (f"status={result.status_code} body={result.body}", self.max_attempts, message_id, self.owner)
+                )
+
+    def _claim_pending(self) -> List[sqlite3.Row]:
+        """
+        Reserva para este processo as mensagens pendentes e as em envio com reserva vencida.
+
+        Returns:
+            Linhas (id, webhook_url, payload, dedup_group), na ordem em que foram gravadas
+        """
+        now = time.time()
+        with self._lock, self._transaction():
+            rows = self._conn.execute(
+                "SELECT id, webhook_url, payload, dedup_group FROM outbox "
+                "WHERE status = 'pending' OR (status = 'sending' AND lease_until < ?) ORDER BY id", (now,)
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE outbox SET status = 'sending', owner = ?, lease_until = ? WHERE id = ?",
+                [(self.owner, now + self.lease_seconds, row['id']) for row in rows]
+            )
+        return rows
+
+    def drain(self, deduplicator=None) -> int:
+        """
+        Reenvia as mensagens pendentes de execuções anteriores. Mensagens reservadas por
+        um processo (este ou outro) com reserva em dia não são reenviadas, então chamar
+        drain mais de uma vez, ou em processos simultâneos, é seguro.
+
+        Args:
+            deduplicator: MessageDeduplicator (opcional); os grupos das mensagens reenviadas
+                são registrados nele como enviados
+
+        Returns:
+            Quantidade de mensagens reenviadas
+        """
+        resent = 0
+        groups = set()
+        for row in self._claim_pending():
+            self._send(row['id'], row['webhook_url'], json.loads(row['payload']))
+            if row['dedup_group']:
+                groups.add((row['webhook_url'], *json.loads(row['dedup_group'])))
+            resent += 1
+        if deduplicator is not None:
+            for webhook_url, date, group_hash in groups:
+                deduplicator.mark_delivered(webhook_url, date, group_hash)
+        if resent:
+            logger.info(f"Outbox do Slack: {resent} mensagens pendentes reenviadas")
+        return resent
+
+    def purge(self, retention_days: int = SLACK_OUTBOX_RETENTION_DAYS) -> int:
+        """Remove mensagens enviadas ou descartadas há mais de retention_days dias."""
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        with self._lock, self._transaction():
+            cursor = self._conn.execute(
+                "DELETE FROM outbox WHERE status IN ('sent', 'failed') AND created_at < ?", (cutoff,)
+            )
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Retorna a quantidade de mensagens por status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self) -> None:
+        """Fecha a conexão com o banco."""
+        with self._lock:
+            self._conn.close()
+
+def open_outbox(delivery_queue=None, path: str = SLACK_OUTBOX_FILE) -> Optional[SlackOutbox]:
+    """Abre o outbox; se o arquivo não puder ser aberto, registra o erro e segue sem outbox."""
+    try:
+        return SlackOutbox(delivery_queue, path)
+    except sqlite3.Error as e:
+        logger.error(f"Erro ao abrir o outbox do Slack em {path}: {e}. Enviando sem outbox.")
+        return None
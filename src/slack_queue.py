@@ -0,0 +1,154 @@
+"""
+Fila de entrega assíncrona das mensagens do Slack.
+
+Cada webhook tem uma thread própria que envia as mensagens na ordem em que foram
+enfileiradas, no ritmo permitido pelo Slack (cerca de 1 mensagem por segundo por
+webhook). Um 429 pausa o webhook pelo tempo do Retry-After e a mensagem é reenviada;
+erros 5xx e falhas de conexão são repetidos com backoff exponencial.
+"""
+
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import SLACK_MAX_RETRIES, SLACK_MESSAGES_PER_MINUTE
+from rate_limiter import TokenBucket
+from slack_delivery import DeliveryResult
+
+logger = logging.getLogger('carga_slack.slack')
+
+MAX_BACKOFF = 60
+
+class SlackDeliveryQueue:
+    """Fila com uma thread de envio por webhook."""
+
+    def __init__(self, delivery, messages_per_minute: float = SLACK_MESSAGES_PER_MINUTE,
+                 max_retries: int = SLACK_MAX_RETRIES):
+        """
+        Args:
+            delivery: Entregador com post(webhook_url, payload) -> DeliveryResult
+            messages_per_minute: Ritmo máximo de envio por webhook
+            max_retries: Tentativas extras para erros 5xx/conexão e para 429
+        """
+        self.delivery = delivery
+        self.messages_per_minute = messages_per_minute
+        self.max_retries = max_retries
+        self._queues: Dict[str, queue.Queue] = {}
+        self._workers: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self.sent = 0
+        self.failed = 0
+
+    def submit(self, webhook_url: str, payload: Dict[str, Any]) -> Future:
+        """
+        Enfileira uma mensagem para o webhook.
+
+        Args:
+            webhook_url: Webhook de destino
+            payload: Corpo da mensagem
+
+        Returns:
+            Future resolvido com o DeliveryResult final da mensagem
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Fila de entrega do Slack já foi encerrada")
+            if webhook_url not in self._queues:
+                self._queues[webhook_url] = queue.Queue()
+                worker = threading.Thread(target=self._run, args=(webhook_url,),
+                                          name=f"slack-{len(self._workers)}", daemon=True)
+                self._workers[webhook_url] = worker
+                worker.start()
+            self._queues[webhook_url].put((payload, future))
+        return future
+
+    def _run(self, webhook_url: str) -> None:
+        """Envia as mensagens de um webhook, na ordem, até receber o sinal de encerramento."""
+        pending = self._queues[webhook_url]
+        limiter = TokenBucket(self.messages_per_minute, capacity=1, name='Slack')
+        while True:
+            item = pending.get()
+            if item is None:
+                pending.task_done()
+                return
+            payload, future = item
+            try:
+                result = self._deliver(limiter, webhook_url, payload)
+            except Exception as e:
+                logger.exception(f"Erro inesperado na fila de entrega do Slack: {e}")
+                result = DeliveryResult(False, None, str(e), 0.0, None)
+            with self._lock:
+                if result.ok:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+            future.set_result(result)
+            pending.task_done()
+
+    def _deliver(self, limiter: TokenBucket, webhook_url: str, payload: Dict[str, Any]) -> DeliveryResult:
+        """Envia uma mensagem, repetindo em caso de 429, 5xx ou falha de conexão."""
+        attempt = 0
+        while True:
+            limiter.acquire()
+            result = self.delivery.post(webhook_url, payload)
+            if result.ok:
+                limiter.on_success()
+                return result
+            retryable = result.status_code is None or result.status_code == 429 or result.status_code >= 500
+            if not retryable or attempt >= self.max_retries:
+                logger.error(f"Falha definitiva ao enviar mensagem ao Slack: status={result.status_code}, "
+                             f"body={result.body}, tentativas={attempt + 1}")
+                return result
+            attempt += 1
+            if result.status_code == 429:
+                limiter.on_rate_limited(result.retry_after)
+            else:
+                wait = min(MAX_BACKOFF, 2 ** (attempt - 1))
+                logger.warning(f"Erro ao enviar mensagem ao Slack (status={result.status_code}). "
+                               f"Nova tentativa {attempt}/{self.max_retries} em {wait}s")
+                time.sleep(wait)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Envia o que estiver na fila e encerra as threads de envio."""
+        with self._lock:
+            self._closed = True
+            queues = list(self._queues.values())
+            workers = list(self._workers.values())
+        for pending in queues:
+            pending.put(None)
+        for worker in workers:
+            worker.join(timeout)
+        logger.info(f"Fila de entrega do Slack encerrada: {self.sent} mensagens enviadas, {self.failed} falhas")
+
+class TrackingSender:
+    """
+    Repassa os envios a um sender (SlackDeliveryQueue ou SlackOutbox) e guarda os Futures,
+    para verificar depois se todas as mensagens de um grupo foram entregues.
+    """
+
+    def __init__(self, sender, **submit_kwargs):
+        """
+        Args:
+            sender: SlackDeliveryQueue ou SlackOutbox
+            submit_kwargs: Argumentos extras repassados a cada submit (ex.: dedup_group do outbox)
+        """
+        self.sender = sender
+        self.submit_kwargs = submit_kwargs
+        self.futures = []
+
+    def submit(self, webhook_url: str, payload: Dict[str, Any]) -> Future:
+        future = self.sender.submit(webhook_url, payload, **self.submit_kwargs)
+        self.futures.append(future)
+        return future
+
+    def delivered(self) -> bool:
+        """Aguarda os envios e retorna True se todos foram aceitos pelo Slack."""
+        return all(future.result().ok for future in self.futures)
@@ -0,0 +1,184 @@
+"""
+Servidor local que imita os webhooks e o chat.postMessage do Slack, para medir o
+envio sem postar em canais reais.
+
+Registra os payloads recebidos e pode injetar latência, respostas 429 com Retry-After
+(aleatórias ou ao passar de um limite de mensagens por segundo por webhook, como o
+Slack faz) e erros 5xx.
+
+Uso:
+    python src/slack_stub_server.py --port 8099 --latency-ms 150 --per-hook-rate 1 --error-rate 0.02
+
+Os webhooks ficam em http://127.0.0.1:8099/<qualquer caminho> e o chat.postMessage em
+http://127.0.0.1:8099/api/chat.postMessage.
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+logger = logging.getLogger('carga_slack.slack')
+
+class SlackStubServer:
+    """Servidor HTTP que responde como o Slack, com falhas configuráveis."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 rate_limit_rate: float = 0.0, per_hook_rate: Optional[float] = None, retry_after: float = 1.0,
+                 error_rate: float = 0.0, record_file: Optional[str] = None, seed: Optional[int] = None):
+        """
+        Args:
+            host: Endereço de escuta
+            port: Porta (0 escolhe uma porta livre)
+            latency_ms: Latência adicionada a cada resposta
+            jitter_ms: Variação aleatória (0 a jitter_ms) somada à latência
+            rate_limit_rate: Probabilidade de responder 429 a qualquer requisição
+            per_hook_rate: Mensagens por segundo aceitas por webhook/canal antes de responder 429
+            retry_after: Valor do header Retry-After nas respostas 429, em segundos
+            error_rate: Probabilidade de responder 500
+            record_file: Arquivo JSON por linha onde os payloads aceitos são gravados (opcional)
+            seed: Semente do gerador aleatório, para execuções reproduzíveis
+        """
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.rate_limit_rate = rate_limit_rate
+        self.per_hook_rate = per_hook_rate
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.record_file = record_file
+        self.random = random.Random(seed)
+        self.received: List[Dict[str, Any]] = []
+        self.counts = {'accepted': 0, 'rate_limited': 0, 'errors': 0}
+        self._recent: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode('utf-8') if length else ''
+                status, headers, response = stub.handle(self.path, self.headers.get('Content-Type', ''), body)
+                data = response.encode('utf-8')
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug("Stub do Slack: " + format, *args)
+
+        return Handler
+
+    def handle(self, path: str, content_type: str, body: str):
+        """
+        Decide a resposta a uma requisição.
+
+        Returns:
+            Tupla (status HTTP, headers, corpo da resposta)
+        """
+        is_api = path.startswith('/api/')
+        if 'application/x-www-form-urlencoded' in content_type:
+            payload = {key: values[0] for key, values in parse_qs(body).items()}
+        else:
+            try:
+                payload = json.loads(body) if body else {}
+            except ValueError:
+                return 400, {}, 'invalid_payload'
+        target = payload.get('channel', path) if is_api else path
+
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+
+        with self._lock:
+            now = time.monotonic()
+            rate_limited = self.random.random() < self.rate_limit_rate
+            if not rate_limited and self.per_hook_rate:
+                recent = self._recent.setdefault(target, deque())
+                while recent and now - recent[0] >= 1.0:
+                    recent.popleft()
+                rate_limited = len(recent) >= self.per_hook_rate
+            if rate_limited:
+                self.counts['rate_limited'] += 1
+                headers = {'Retry-After': f"{self.retry_after:g}"}
+                if is_api:
+                    headers['Content-Type'] = 'application/json'
+                    return 429, headers, json.dumps({'ok': False, 'error': 'ratelimited'})
+                return 429, headers, 'rate_limited'
+            if self.random.random() < self.error_rate:
+                self.counts['errors'] += 1
+                return 500, {}, 'internal_error'
+
+            if self.per_hook_rate:
+                self._recent[target].append(now)
+            self.counts['accepted'] += 1
+            record = {'path': path, 'payload': payload, 'received_at': time.time()}
+            self.received.append(record)
+            if self.record_file:
+                with open(self.record_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        if is_api:
+            response = {'ok': True, 'channel': payload.get('channel'), 'ts': f"{time.time():.6f}"}
+            return 200, {'Content-Type': 'application/json'}, json.dumps(response)
+        return 200, {}, 'ok'
+
+    def start(self) -> 'SlackStubServer':
+        """Inicia o servidor em uma thread em segundo plano."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='slack-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Para o servidor."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Servidor local que imita os webhooks do Slack')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Latência de cada resposta')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Variação aleatória somada à latência')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Probabilidade de responder 429')
+    parser.add_argument('--per-hook-rate', type=float, default=None,
+                        help='Mensagens por segundo aceitas por webhook antes de responder 429')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After das respostas 429 (segundos)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probabilidade de responder 500')
+    parser.add_argument('--record', dest='record_file', default=None, help='Grava os payloads aceitos (JSON por linha)')
+    parser.add_argument('--seed', type=int, default=None)
+    return parser
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = build_parser().parse_args()
+    server = SlackStubServer(args.host, args.port, args.latency_ms, args.jitter_ms, args.rate_limit_rate,
+                             args.per_hook_rate, args.retry_after, args.error_rate, args.record_file, args.seed)
+    logger.info(f"Stub do Slack ouvindo em {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info(f"Stub do Slack encerrado: {server.counts}")
+        server.httpd.server_close()
@@ -0,0 +1,74 @@
+"""
+Conversão vetorizada dos valores monetários lidos das planilhas.
+
+As funções recebem uma coluna inteira ("R$ 1.234,56", "$ 12,00", "#DIV/0!", ...) e
+fazem a conversão em uma única passada com pandas, seguindo as mesmas regras das
+funções escalares de main.py (to_float e is_dollar_value).
+"""
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+def _as_strings(values: Sequence[Any]) -> pd.Series:
+    """Converte a coluna em uma Series de strings (None vira string vazia)."""
+    series = pd.Series(list(values), dtype='object')
+    return series.where(series.notna(), '').astype(str)
+
+def parse_currency_column(values: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Converte uma coluna de valores monetários em números e identifica os valores em dólar.
+
+    Args:
+        values: Valores da coluna, como lidos da planilha
+
+    Returns:
+        Tupla (valores float, indicador de dólar). Valores inválidos viram 0.0,
+        como em to_float.
+    """
+    series = _as_strings(values)
+    stripped = series.str.strip()
+    is_dollar = (
+        stripped.str.contains('$', regex=False) & ~stripped.str.contains('R$', regex=False)
+    ).to_numpy(dtype=bool)
+
+    number = (
+        series.str.replace('R$', '', regex=False)
+        .str.replace(' ', '', regex=False)
+        .str.extract(r'(-?\d+[\d.,]*)', expand=False)
+        .str.replace('.', '', regex=False)
+        .str.replace(',', '.', regex=False)
+    )
+    floats = pd.to_numeric(number, errors='coerce').fillna(0.0).to_numpy(dtype=float)
+    return floats, is_dollar
+
+def sum_records(records: List[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Soma investimento, receita (separada em reais e dólares) e MC de uma lista de registros.
+
+    Args:
+        records: Registros retornados por GoogleSheetsProcessor.read_data
+
+    Returns:
+        Dicionário com investimento, receita_real, receita_dolar e mc
+    """
+    if not records:
+        return {'investimento': 0.0, 'receita_real': 0.0, 'receita_dolar': 0.0, 'mc': 0.0}
+    if all(hasattr(r, 'investimento_valor') for r in records):
+        # SheetRecord: valores já convertidos na leitura da aba
+        return {
+            'investimento': sum(r.investimento_valor for r in records),
+            'receita_real': sum(r.receita_valor for r in records if not r.receita_em_dolar),
+            'receita_dolar': sum(r.receita_valor for r in records if r.receita_em_dolar),
+            'mc': sum(r.mc_valor for r in records)
+        }
+    investimento, _ = parse_currency_column([r.get('Investimento') for r in records])
+    receita, receita_is_dollar = parse_currency_column([r.get('Receita') for r in records])
+    mc, _ = parse_currency_column([r.get('MC Geral') for r in records])
+    return {
+        'investimento': float(investimento.sum()),
+        'receita_real': float(receita[~receita_is_dollar].sum()),
+        'receita_dolar': float(receita[receita_is_dollar].sum()),
+        'mc': float(mc.sum())
+    }